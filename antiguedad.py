@@ -0,0 +1,56 @@
+"""
+Antigüedad de los papeles a retirar calculada en la consulta
+
+`DiasDesde` compila a la diferencia de días del motor (DATEDIFF en MySQL,
+julianday en SQLite) para que la columna llegue calculada con cada fila. Los
+filtros por antigüedad, en cambio, se traducen a rangos sobre la fecha de
+presentación, que pueden resolverse con su índice sin evaluar la expresión
+en cada fila.
+"""
+
+from datetime import timedelta
+
+from sqlalchemy import Integer
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+# Rangos de antigüedad en días (hasta None = sin límite)
+RANGOS = {
+    '0-7': (0, 7),
+    '8-30': (8, 30),
+    '31+': (31, None),
+}
+
+
+class DiasDesde(FunctionElement):
+    """Días transcurridos desde una fecha hasta la fecha de referencia"""
+    type = Integer()
+    inherit_cache = True
+    name = 'dias_desde'
+
+
+@compiles(DiasDesde)
+def _dias_desde(elemento, compilador, **kw):
+    fecha, hoy = list(elemento.clauses)
+    return 'CAST(julianday(%s) - julianday(%s) AS INTEGER)' % (
+        compilador.process(hoy, **kw), compilador.process(fecha, **kw))
+
+
+@compiles(DiasDesde, 'mysql')
+def _dias_desde_mysql(elemento, compilador, **kw):
+    fecha, hoy = list(elemento.clauses)
+    return 'DATEDIFF(%s, %s)' % (compilador.process(hoy, **kw), compilador.process(fecha, **kw))
+
+
+def limites(hoy, desde_dias, hasta_dias=None):
+    """Fechas de presentación (mínima, máxima) con antigüedad entre los días indicados"""
+    minima = hoy - timedelta(days=hasta_dias) if hasta_dias is not None else None
+    return minima, hoy - timedelta(days=desde_dias)
+
+
+def filtrar(query, columna, hoy, desde_dias, hasta_dias=None):
+    """Restringir la consulta a los registros con la antigüedad indicada"""
+    minima, maxima = limites(hoy, desde_dias, hasta_dias)
+    if minima is not None:
+        query = query.filter(columna >= minima)
+    return query.filter(columna <= maxima)
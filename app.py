@@ -1,60 +1,351 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, Blueprint, current_app, render_template, request, redirect, url_for, flash, make_response, Response, stream_with_context, get_template_attribute
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
-from datetime import datetime
-import pytz
+from markupsafe import Markup
+from sqlalchemy.exc import IntegrityError
+import click
+from datetime import datetime, timedelta
+import hashlib
+import io
+import json
+import time
 import os
+import re
 
-app = Flask(__name__)
+from config import config
+from paginacion import Pagina, paginar, decodificar_cursor, CursorInvalido
+from busqueda import IndiceBusqueda
+from autocompletado import IndicePrefijos
+from versiones import Versiones
+from cache import CacheLRU
+from exportacion import FORMATOS, exportar, interpretar_desde, limites_superiores, valor_serializable
+from importacion import ImportadorVehiculos
+from resumen import Resumen
+import antiguedad
+from lotes import EliminadorLotes
+from purga import Purga
+from cache_fragmentos import CacheFragmentos
+from instrumentacion import Instrumentacion
+from metricas import Metricas
+from cambios import Cambios, LimiteFlujos, ALTA, REINICIO
+from texto_completo import TextoCompleto, fragmento
+import patentes
+from patentes import normalizar_patente, validar_patente, prefijo_patente
+import fechas
+from fechas import ARGENTINA_TZ
 
-# Configurar timezone de Argentina
-ARGENTINA_TZ = pytz.timezone('America/Argentina/Buenos_Aires')
+db = SQLAlchemy()
+migrate = Migrate()
 
-# Configuración de la aplicación
-app.config['SECRET_KEY'] = 'mi_super_secreto_12345'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'mysql+pymysql://root@localhost/gestoria'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Rutas y comandos de la aplicación
+bp = Blueprint('main', __name__, cli_group=None)
 
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+def create_app(config_name=None):
+    """Crear la aplicación con la configuración indicada (por defecto FLASK_CONFIG)"""
+    config_name = config_name or os.environ.get('FLASK_CONFIG', 'default')
+    app = Flask(__name__)
+    app.config.from_object(config[config_name])
+    if not app.config['SECRET_KEY']:
+        # Con una clave conocida cualquiera podría firmar cookies de sesión válidas
+        raise RuntimeError('falta la variable de entorno SECRET_KEY')
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        # SQLite no usa el pool ni los timeouts de conexión de MySQL
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {}
+    
+    db.init_app(app)
+    migrate.init_app(app, db, include_object=texto_completo.incluir_objeto)
+    
+    cache_patentes.capacidad = app.config['CACHE_PATENTES_CAPACIDAD']
+    cache_patentes.ttl = app.config['CACHE_PATENTES_TTL']
+    cache_patentes.ttl_negativo = app.config['CACHE_PATENTES_TTL_NEGATIVO']
+    indice_prefijos.intervalo_recarga = app.config['INDICE_PREFIJOS_RECARGA']
+    limite_flujos.maximo = app.config['CAMBIOS_MAX_FLUJOS']
+    cambios.retener = app.config['CAMBIOS_RETENER']
+    
+    backend = app.config['CACHE_FRAGMENTOS']
+    opciones = {
+        'memoria': {'capacidad': app.config['CACHE_FRAGMENTOS_CAPACIDAD'], 'ttl': app.config['CACHE_FRAGMENTOS_TTL']},
+        'archivos': {
+            'directorio': app.config['CACHE_FRAGMENTOS_DIR'] or os.path.join(app.instance_path, 'fragmentos'),
+            'ttl': app.config['CACHE_FRAGMENTOS_TTL'],
+            'capacidad': app.config['CACHE_FRAGMENTOS_CAPACIDAD'],
+        },
+    }
+    cache_fragmentos.configurar(backend, **opciones.get(backend, {}))
+    
+    instrumentacion.init_app(app)
+    metricas.init_app(app, estado_pool=lambda: estado_pool(app))
+    app.register_blueprint(bp)
+    return app
 
 # Modelos de base de datos
 class Vehiculo(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    cliente = db.Column(db.String(100), nullable=False)
+    cliente = db.Column(db.String(100), nullable=False, index=True)
     modelo = db.Column(db.String(100), nullable=False)
     lugar_compra = db.Column(db.String(100), nullable=False)
     color = db.Column(db.String(50), nullable=False)
     patente = db.Column(db.String(20), unique=True, nullable=False)
-    fecha_creacion = db.Column(db.DateTime, default=datetime.now(ARGENTINA_TZ))
+    # Clave canónica de la patente (ver patentes.py): búsquedas exactas y por prefijo
+    patente_norm = db.Column(db.String(20), unique=True, index=True, default=patentes.patente_norm_por_defecto)
+    fecha_creacion = db.Column(db.DateTime, default=lambda: datetime.now(ARGENTINA_TZ))
+    __table_args__ = (
+        db.Index('ix_vehiculo_fecha_creacion_id', 'fecha_creacion', 'id'),
+    )
 
 class Gestoria(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    cliente = db.Column(db.String(100), nullable=False)
-    patente = db.Column(db.String(20), nullable=False)
+    cliente = db.Column(db.String(100), nullable=False, index=True)
+    patente = db.Column(db.String(20), nullable=False, index=True)
+    patente_norm = db.Column(db.String(20), index=True, default=patentes.patente_norm_por_defecto)
     papeles_recibidos = db.Column(db.Text, nullable=False)
     observaciones = db.Column(db.Text)
-    fecha_creacion = db.Column(db.DateTime, default=datetime.now(ARGENTINA_TZ))
+    fecha_creacion = db.Column(db.DateTime, default=lambda: datetime.now(ARGENTINA_TZ))
+    __table_args__ = (
+        db.Index('ix_gestoria_fecha_creacion_id', 'fecha_creacion', 'id'),
+    )
 
 class EntregaPapeles(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    cliente = db.Column(db.String(100), nullable=False)
-    patente = db.Column(db.String(20), nullable=False)
+    cliente = db.Column(db.String(100), nullable=False, index=True)
+    patente = db.Column(db.String(20), nullable=False, index=True)
+    patente_norm = db.Column(db.String(20), index=True, default=patentes.patente_norm_por_defecto)
     fecha_entrega = db.Column(db.Date, nullable=False)
     documentacion_entregada = db.Column(db.Text, nullable=False)
-    fecha_creacion = db.Column(db.DateTime, default=datetime.now(ARGENTINA_TZ))
+    fecha_creacion = db.Column(db.DateTime, default=lambda: datetime.now(ARGENTINA_TZ))
+    __table_args__ = (
+        db.Index('ix_entrega_papeles_fecha_creacion_id', 'fecha_creacion', 'id'),
+    )
 
 class PapelesRetirar(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    cliente = db.Column(db.String(100), nullable=False)
-    patente = db.Column(db.String(20), nullable=False)
+    cliente = db.Column(db.String(100), nullable=False, index=True)
+    patente = db.Column(db.String(20), nullable=False, index=True)
+    patente_norm = db.Column(db.String(20), index=True, default=patentes.patente_norm_por_defecto)
     lugar_registro = db.Column(db.String(100), nullable=False)
     fecha_presentacion = db.Column(db.Date, nullable=False)
     comentarios = db.Column(db.Text)
-    fecha_creacion = db.Column(db.DateTime, default=datetime.now(ARGENTINA_TZ))
+    fecha_creacion = db.Column(db.DateTime, default=lambda: datetime.now(ARGENTINA_TZ))
+    __table_args__ = (
+        db.Index('ix_papeles_retirar_fecha_creacion_id', 'fecha_creacion', 'id'),
+        db.Index('ix_papeles_retirar_lugar_fecha', 'lugar_registro', 'fecha_presentacion'),
+        db.Index('ix_papeles_retirar_fecha_presentacion_id', 'fecha_presentacion', 'id'),
+    )
+
+class TrigramaBusqueda(db.Model):
+    """Trigramas normalizados de los campos de texto filtrables"""
+    __tablename__ = 'busqueda_trigrama'
+    tabla = db.Column(db.String(50), primary_key=True)
+    campo = db.Column(db.String(50), primary_key=True)
+    trigrama = db.Column(db.String(3), primary_key=True)
+    registro_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    __table_args__ = (
+        db.Index('ix_busqueda_trigrama_registro', 'tabla', 'registro_id'),
+    )
+
+class VersionTabla(db.Model):
+    """Versión de cada tabla, incrementada en cada escritura"""
+    __tablename__ = 'version_tabla'
+    tabla = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    actualizado = db.Column(db.DateTime)
+
+class ResumenDiario(db.Model):
+    """Registros creados por entidad y día"""
+    __tablename__ = 'resumen_diario'
+    entidad = db.Column(db.String(50), primary_key=True)
+    dia = db.Column(db.Date, primary_key=True)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+
+class ResumenRetiro(db.Model):
+    """Papeles a retirar por lugar de registro y fecha de presentación"""
+    __tablename__ = 'resumen_retiro'
+    lugar_registro = db.Column(db.String(100), primary_key=True)
+    fecha_presentacion = db.Column(db.Date, primary_key=True)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+
+class Cambio(db.Model):
+    """Diario de altas y bajas; el id es el número de secuencia del evento"""
+    __tablename__ = 'cambio'
+    id = db.Column(db.Integer, primary_key=True)
+    tabla = db.Column(db.String(50), nullable=False)
+    operacion = db.Column(db.String(10), nullable=False)
+    registro_id = db.Column(db.Integer)
+    fecha = db.Column(db.DateTime, nullable=False)
+    # Sin AUTOINCREMENT, SQLite podría reutilizar ids después de un recorte
+    __table_args__ = {'sqlite_autoincrement': True}
+
+# Modelos de datos por nombre de tabla
+MODELOS = {modelo.__tablename__: modelo for modelo in (Vehiculo, Gestoria, EntregaPapeles, PapelesRetirar)}
+
+# Versiones por tabla para ETags y cachés
+versiones = Versiones(db, VersionTabla)
+versiones.registrar(Vehiculo, Gestoria, EntregaPapeles, PapelesRetirar)
+
+# Índice de búsqueda por subcadena para los filtros de los listados
+indice_busqueda = IndiceBusqueda(db, TrigramaBusqueda)
+indice_busqueda.registrar(Vehiculo, ('cliente',))
+indice_busqueda.registrar(Gestoria, ('cliente',))
+indice_busqueda.registrar(EntregaPapeles, ('cliente',))
+indice_busqueda.registrar(PapelesRetirar, ('cliente', 'lugar_registro'))
+
+# La patente normalizada se recalcula al asignar la patente (los INSERT masivos usan el default)
+patentes.registrar(Vehiculo, Gestoria, EntregaPapeles, PapelesRetirar)
+
+# Contadores del tablero, actualizados en la misma transacción que cada escritura
+resumen = Resumen(db, ResumenDiario, ResumenRetiro, PapelesRetirar)
+resumen.registrar(Vehiculo, Gestoria, EntregaPapeles, PapelesRetirar)
+
+# Diario de altas y bajas para actualizar los listados en vivo (/eventos)
+cambios = Cambios(db, Cambio)
+cambios.registrar(Vehiculo, Gestoria, EntregaPapeles, PapelesRetirar)
+
+# Streams de /eventos abiertos a la vez: cada uno ocupa un hilo del servidor
+limite_flujos = LimiteFlujos()
+
+# Búsqueda de texto completo (FULLTEXT en MySQL, FTS5 en SQLite) para /buscar
+texto_completo = TextoCompleto(db)
+texto_completo.registrar(Vehiculo, ('cliente', 'modelo', 'lugar_compra', 'color'))
+texto_completo.registrar(Gestoria, ('cliente', 'papeles_recibidos', 'observaciones'))
+texto_completo.registrar(EntregaPapeles, ('cliente', 'documentacion_entregada'))
+texto_completo.registrar(PapelesRetirar, ('cliente', 'lugar_registro', 'comentarios'))
+
+# Índice en memoria para el autocompletado de patentes por prefijo
+indice_prefijos = IndicePrefijos()
+
+def obtener_indice_prefijos():
+    """Índice de autocompletado, cargado desde la base la primera vez y recargado
+    cuando otro proceso modificó la tabla (a lo sumo cada INDICE_PREFIJOS_RECARGA segundos)"""
+    version, _ = versiones.obtener('vehiculo')
+    if not indice_prefijos.vigente(version):
+        indice_prefijos.recargar(
+            version, lambda: Vehiculo.query.with_entities(Vehiculo.patente, Vehiculo.cliente).all()
+        )
+    return indice_prefijos
+
+# Caché de búsquedas por patente (incluye las patentes inexistentes), por versión de la tabla
+cache_patentes = CacheLRU()
+
+# Caché de las tablas renderizadas de los listados
+cache_fragmentos = CacheFragmentos()
+
+# Tiempos por pedido (Server-Timing) y registro de consultas lentas
+instrumentacion = Instrumentacion()
+
+# Métricas de Prometheus (/metrics)
+metricas = Metricas()
+instrumentacion.observadores.append(metricas.consulta)
+
+def estado_pool(app):
+    """Conexiones del pool por estado (sólo pools de tamaño fijo, como el de MySQL)"""
+    with app.app_context():
+        pool = db.engine.pool
+    if not hasattr(pool, 'checkedout'):
+        return {}
+    return {
+        'en_uso': pool.checkedout(),
+        'disponibles': pool.checkedin(),
+        'desborde': max(pool.overflow(), 0),
+        'tamano': pool.size(),
+    }
+
+# Importación masiva de vehículos desde CSV
+importador_vehiculos = ImportadorVehiculos(db, Vehiculo, indice_busqueda, versiones, resumen, cambios)
+
+def importar_vehiculos_csv(archivo):
+    """Importar vehículos y refrescar las cachés que dependen de la tabla"""
+    resultado = importador_vehiculos.importar(archivo)
+    indice_prefijos.invalidar()
+    cache_patentes.limpiar()
+    return resultado
+
+# Eliminación por lotes de los registros seleccionados
+eliminador_lotes = EliminadorLotes(db, indice_busqueda, versiones, resumen, cambios)
+
+def eliminar_seleccionados_de(modelo, ids):
+    """Eliminar por lotes y refrescar las cachés que dependen de la tabla"""
+    eliminados = eliminador_lotes.eliminar(modelo, ids)
+    if eliminados and modelo is Vehiculo:
+        indice_prefijos.invalidar()
+        cache_patentes.limpiar()
+    return eliminados
+
+# Reinicio de datos (desarrollo) y purga de registros antiguos
+purga = Purga(db, versiones, eliminar_seleccionados_de)
+
+def reiniciar_datos():
+    """Vaciar todas las tablas de datos con sus índices y contadores"""
+    tablas = purga.reiniciar(MODELOS.values(), (TrigramaBusqueda, ResumenDiario, ResumenRetiro))
+    # El diario no se vacía: la secuencia de eventos debe seguir creciendo
+    with db.engine.begin() as connection:
+        for tabla in MODELOS:
+            cambios.anotar(connection, tabla, REINICIO)
+    indice_prefijos.invalidar()
+    cache_patentes.limpiar()
+    return tablas
+
+def reinicio_permitido():
+    return current_app.debug or current_app.config['PERMITIR_REINICIO_DATOS']
+
+@bp.cli.command('reiniciar-datos')
+@click.confirmation_option(prompt='¿Eliminar TODOS los datos? Esta acción no se puede deshacer')
+def reiniciar_datos_comando():
+    """Vaciar todas las tablas (sólo desarrollo y pruebas)"""
+    if not reinicio_permitido():
+        raise click.ClickException('el reinicio de datos está deshabilitado en esta configuración')
+    for tabla in reiniciar_datos():
+        print(f"🧹 {tabla} vaciada")
+
+@bp.cli.command('purgar-antiguos')
+@click.option('--dias', type=click.IntRange(min=1), required=True, help='antigüedad mínima en días')
+@click.option('--tabla', type=click.Choice(['todas', *MODELOS]), default='todas')
+@click.option('--lote', type=click.IntRange(min=1), default=None, help='registros por transacción')
+@click.option('--pausa', type=click.FloatRange(min=0), default=None, help='segundos entre lotes')
+def purgar_antiguos(dias, tabla, lote, pausa):
+    """Eliminar por lotes los registros creados hace más de N días"""
+    lote = lote or current_app.config['PURGA_LOTE']
+    pausa = current_app.config['PURGA_PAUSA'] if pausa is None else pausa
+    limite = datetime.now(ARGENTINA_TZ).replace(tzinfo=None) - timedelta(days=dias)
+    modelos = MODELOS.values() if tabla == 'todas' else [MODELOS[tabla]]
+    for modelo in modelos:
+        pendientes = purga.contar_antiguos(modelo, limite)
+        print(f"🗑️  {modelo.__tablename__}: {pendientes} registros anteriores al {limite:%d/%m/%Y}")
+        if not pendientes:
+            continue
+        with click.progressbar(length=pendientes, label=modelo.__tablename__) as barra:
+            anterior = [0]
+            def progreso(total):
+                barra.update(total - anterior[0])
+                anterior[0] = total
+            total = purga.purgar_antiguos(modelo, limite, lote, pausa, progreso)
+        print(f"✅ {modelo.__tablename__}: {total} registros eliminados")
+
+@bp.cli.command('importar-vehiculos')
+@click.argument('archivo', type=click.Path(exists=True, dir_okay=False))
+def importar_vehiculos_comando(archivo):
+    """Importar vehículos desde un archivo CSV"""
+    with open(archivo, newline='', encoding='utf-8-sig') as f:
+        resultado = importar_vehiculos_csv(f)
+    for linea, motivo in resultado.rechazos:
+        print(f"⚠️  Línea {linea}: {motivo}")
+    print(f"📥 {resultado.resumen()}")
+
+@bp.cli.command('reindexar-busqueda')
+def reindexar_busqueda():
+    """Reconstruir el índice de trigramas y el de texto completo con los datos existentes"""
+    for tabla, total in indice_busqueda.reconstruir().items():
+        print(f"🔎 {tabla}: {total} registros indexados")
+    for tabla, total in texto_completo.reconstruir().items():
+        print(f"📝 {tabla}: {total} registros en el índice de texto completo")
+
+@bp.cli.command('recalcular-dashboard')
+def recalcular_dashboard():
+    """Reconstruir los contadores del tablero desde las tablas de datos"""
+    for tabla, total in resumen.recalcular().items():
+        print(f"📊 {tabla}: {total} registros")
 
 # Función para verificar conexión a la base de datos
-def check_db_connection():
+def check_db_connection(app):
     """Verificar conexión a la base de datos"""
     try:
         with app.app_context():
@@ -72,113 +363,371 @@ def check_db_connection():
         print("   - El usuario 'root' tenga permisos")
         return False
 
-@app.route('/')
+def obtener_pagina(query, columna, columna_id):
+    """Paginar un listado según los cursores recibidos en la URL (la primera página si no son válidos)"""
+    por_pagina = current_app.config['ITEMS_PER_PAGE']
+    try:
+        return paginar(query, columna, columna_id, por_pagina,
+                       despues=request.args.get('despues'),
+                       antes=request.args.get('antes'))
+    except CursorInvalido:
+        return paginar(query, columna, columna_id, por_pagina)
+
+def cursores_validos(columna):
+    """Si los cursores de paginación de la URL se pueden decodificar"""
+    try:
+        for cursor in (request.args.get('despues'), request.args.get('antes')):
+            if cursor:
+                decodificar_cursor(cursor, columna)
+    except CursorInvalido:
+        return False
+    return True
+
+def respuesta_condicional(tabla, generar, *claves):
+    """Responder con ETag según la versión de la tabla.
+
+    Si el cliente ya tiene la versión vigente se responde 304 sin ejecutar
+    `generar`, que es la función que consulta la base y arma el cuerpo. La
+    recibe como argumento la versión leída, para usarla en claves de caché.
+    """
+    version, actualizado = versiones.obtener(tabla)
+    etag = f'{tabla}-{version}'
+    if any(claves):
+        etag += '-' + hashlib.sha1('\0'.join(claves).encode('utf-8')).hexdigest()[:16]
+    if request.if_none_match.contains(etag):
+        respuesta = make_response('', 304)
+    else:
+        respuesta = make_response(generar(version))
+    respuesta.set_etag(etag)
+    if actualizado:
+        respuesta.last_modified = actualizado
+    # Los clientes pueden guardar la respuesta pero deben revalidarla
+    respuesta.cache_control.no_cache = True
+    return respuesta
+
+def consultar_expediente(patente):
+    """Historial completo de una patente en una sola consulta (UNION ALL).
+
+    Cada tabla aporta las mismas columnas: tipo, id, cliente, detalle, la
+    fecha propia del documento (si tiene) y la fecha de creación. Todas las
+    ramas filtran por igualdad sobre la columna patente_norm indexada.
+    """
+    patente = normalizar_patente(patente)
+    sin_fecha = db.cast(db.null(), db.Date)
+    consulta = db.union_all(
+        db.select(
+            db.literal('vehiculo').label('tipo'), Vehiculo.id, Vehiculo.cliente,
+            (Vehiculo.modelo + ' - ' + Vehiculo.color + ' - ' + Vehiculo.lugar_compra).label('detalle'),
+            sin_fecha.label('fecha_documento'), Vehiculo.fecha_creacion
+        ).where(Vehiculo.patente_norm == patente),
+        db.select(
+            db.literal('gestoria'), Gestoria.id, Gestoria.cliente,
+            Gestoria.papeles_recibidos + db.func.coalesce(' - ' + Gestoria.observaciones, ''),
+            sin_fecha, Gestoria.fecha_creacion
+        ).where(Gestoria.patente_norm == patente),
+        db.select(
+            db.literal('entrega_papeles'), EntregaPapeles.id, EntregaPapeles.cliente,
+            EntregaPapeles.documentacion_entregada,
+            EntregaPapeles.fecha_entrega, EntregaPapeles.fecha_creacion
+        ).where(EntregaPapeles.patente_norm == patente),
+        db.select(
+            db.literal('papeles_retirar'), PapelesRetirar.id, PapelesRetirar.cliente,
+            PapelesRetirar.lugar_registro + db.func.coalesce(' - ' + PapelesRetirar.comentarios, ''),
+            PapelesRetirar.fecha_presentacion, PapelesRetirar.fecha_creacion
+        ).where(PapelesRetirar.patente_norm == patente)
+    )
+    
+    eventos = []
+    for fila in db.session.execute(consulta):
+        evento = dict(fila._mapping)
+        # La línea de tiempo usa la fecha del documento y, si no tiene, la de creación
+        evento['fecha'] = (datetime.combine(evento['fecha_documento'], datetime.min.time())
+                           if evento['fecha_documento'] else evento['fecha_creacion'])
+        eventos.append(evento)
+    eventos.sort(key=lambda evento: (evento['fecha'] or datetime.min, evento['id']), reverse=True)
+    return eventos
+
+def tabla_cacheada(modelo, plantilla, consultar, *extra, orden=None):
+    """Tabla del listado renderizada, reutilizada mientras no cambie la versión de la tabla"""
+    # El aviso va fuera de `consultar`, que no se ejecuta cuando la tabla sale de la caché
+    if not cursores_validos(modelo.fecha_creacion if orden is None else orden):
+        flash('El enlace de paginación no es válido, se muestra la primera página', 'error')
+    # La versión se lee antes de consultar: una escritura posterior genera otra clave
+    version, _ = versiones.obtener(modelo.__tablename__)
+    clave = cache_fragmentos.clave(request.endpoint, version, request.args.items(multi=True), *extra)
+    return Markup(cache_fragmentos.obtener(clave, lambda: render_template(plantilla, **consultar())))
+
+# Filtros de los listados, compartidos por las páginas y la API de datos
+
+def filas_listado(modelo, **calculadas):
+    """Consulta de sólo lectura que devuelve filas livianas (Row) en lugar de instancias del ORM.
+
+    Las filas son tuplas con acceso por atributo (`fila.cliente`), así que
+    las plantillas no cambian; no pasan por el mapa de identidad de la
+    sesión ni guardan estado de seguimiento de cambios.
+    """
+    columnas = [getattr(modelo, columna.key) for columna in modelo.__table__.columns]
+    columnas += [expresion.label(nombre) for nombre, expresion in calculadas.items()]
+    return modelo.query.with_entities(*columnas)
+
+def filtrar_cliente_patente(query, modelo, args):
+    """Filtros por subcadena de cliente y por prefijo de la patente normalizada"""
+    cliente = args.get('cliente', '')
+    patente = normalizar_patente(args.get('patente', ''))
+    if cliente:
+        query = query.filter(indice_busqueda.contiene(modelo.cliente, cliente))
+    if patente:
+        query = query.filter(prefijo_patente(modelo.patente_norm, patente))
+    return query
+
+def dias_desde_presentacion(hoy):
+    """Expresión SQL con los días transcurridos desde la fecha de presentación"""
+    return antiguedad.DiasDesde(PapelesRetirar.fecha_presentacion, db.literal(hoy, db.Date))
+
+def filtrar_papeles_retirar(query, args, hoy):
+    """Filtros de papeles a retirar: cliente, lugar, patente, vencidos y antigüedad"""
+    query = filtrar_cliente_patente(query, PapelesRetirar, args)
+    lugar = args.get('lugar', '')
+    if lugar:
+        query = query.filter(indice_busqueda.contiene(PapelesRetirar.lugar_registro, lugar))
+    # La antigüedad se filtra como rango de fechas para usar el índice de fecha_presentacion
+    if args.get('vencidos') == '1':
+        dias_vencimiento = current_app.config['DIAS_VENCIMIENTO_RETIRO']
+        query = antiguedad.filtrar(query, PapelesRetirar.fecha_presentacion, hoy, dias_vencimiento + 1)
+    if args.get('antiguedad') in antiguedad.RANGOS:
+        query = antiguedad.filtrar(query, PapelesRetirar.fecha_presentacion, hoy,
+                                   *antiguedad.RANGOS[args['antiguedad']])
+    return query
+
+def listado_completo(query, columna, columna_id, filas, titulo, *argumentos_fila):
+    """Página con todas las filas de la consulta, renderizada y enviada por partes"""
+    lote = current_app.config['LISTADO_COMPLETO_LOTE']
+    registros = query.order_by(columna.desc(), columna_id.desc()).yield_per(lote)
+    contexto = dict(registros=registros, filas=filas, titulo=titulo, tabla=columna.table.name,
+                    argumentos_fila=argumentos_fila)
+    current_app.update_template_context(contexto)
+    stream = current_app.jinja_env.get_template('listado_completo.html').stream(contexto)
+    # Agrupar la salida en bloques de varias filas en lugar de un envío por fragmento
+    stream.enable_buffering(lote)
+    return Response(stream_with_context(stream), mimetype='text/html')
+
+@bp.app_template_global()
+def url_pagina(**cursor):
+    """URL de la página actual conservando los filtros y cambiando el cursor"""
+    args = {k: v for k, v in request.args.items() if k not in ('despues', 'antes')}
+    args.update(cursor)
+    return url_for(request.endpoint, **args)
+
+@bp.route('/')
 def index():
-    return redirect(url_for('vehiculos'))
+    return redirect(url_for('main.vehiculos'))
 
-@app.route('/vehiculos')
+@bp.route('/vehiculos')
 def vehiculos():
     try:
         # Obtener parámetros de filtro
         cliente_filter = request.args.get('cliente', '')
         patente_filter = request.args.get('patente', '')
         
-        # Construir consulta base
-        query = Vehiculo.query
+        # Construir consulta con los filtros presentes
+        query = filtrar_cliente_patente(filas_listado(Vehiculo), Vehiculo, request.args)
         
-        # Aplicar filtros si están presentes
-        if cliente_filter:
-            query = query.filter(Vehiculo.cliente.ilike(f'%{cliente_filter}%'))
-        if patente_filter:
-            query = query.filter(Vehiculo.patente.ilike(f'%{patente_filter.upper()}%'))
+        # Listado completo sin paginar, enviado a medida que se leen las filas
+        if request.args.get('todo') == '1':
+            return listado_completo(query, Vehiculo.fecha_creacion, Vehiculo.id,
+                                    '_filas_vehiculos.html', 'Vehículos')
         
-        # Ordenar por fecha de creación (más reciente primero)
-        vehiculos_list = query.order_by(Vehiculo.fecha_creacion.desc()).all()
+        def consultar():
+            # Paginar por fecha de creación (más reciente primero)
+            vehiculos_list = obtener_pagina(query, Vehiculo.fecha_creacion, Vehiculo.id)
+            return dict(vehiculos=vehiculos_list, cliente_filter=cliente_filter, patente_filter=patente_filter)
         
         return render_template('vehiculos.html', 
-                             vehiculos=vehiculos_list, 
+                             ultimo_cambio=cambios.ultimo(),
+                             tabla=tabla_cacheada(Vehiculo, '_tabla_vehiculos.html', consultar),
                              cliente_filter=cliente_filter, 
                              patente_filter=patente_filter)
     except Exception as e:
+        metricas.error(e)
         flash(f'Error al cargar vehículos: {str(e)}', 'error')
-        return render_template('vehiculos.html', vehiculos=[], cliente_filter='', patente_filter='')
+        tabla = render_template('_tabla_vehiculos.html', vehiculos=Pagina([]), cliente_filter='', patente_filter='')
+        return render_template('vehiculos.html', tabla=Markup(tabla), cliente_filter='', patente_filter='')
 
-@app.route('/vehiculos/agregar', methods=['POST'])
-def agregar_vehiculo():
-    if request.method == 'POST':
+def agregar_vehiculos(filas):
+    """Validar e insertar varios vehículos en una sola transacción; devuelve id, patente y cliente de cada uno"""
+    datos = []
+    for numero, fila in enumerate(filas, start=1):
         try:
-            cliente = request.form['cliente']
-            modelo = request.form['modelo']
-            lugar_compra = request.form['lugar_compra']
-            color = request.form['color']
-            patente = request.form['patente'].upper()
-            
-            # Verificar si la patente ya existe
-            if Vehiculo.query.filter_by(patente=patente).first():
-                flash('La patente ya existe en el sistema', 'error')
-            else:
-                nuevo_vehiculo = Vehiculo(
-                    cliente=cliente,
-                    modelo=modelo,
-                    lugar_compra=lugar_compra,
-                    color=color,
-                    patente=patente
-                )
-                db.session.add(nuevo_vehiculo)
-                db.session.commit()
-                flash('Vehículo agregado exitosamente', 'success')
-        except Exception as e:
-            db.session.rollback()
-            flash(f'Error al agregar vehículo: {str(e)}', 'error')
-        
-        return redirect(url_for('vehiculos'))
+            datos.append(importador_vehiculos.validar(fila))
+        except ValueError as e:
+            raise ValueError(f'vehículo {numero}: {e}' if len(filas) > 1 else str(e))
+    claves = [d['patente_norm'] for d in datos]
+    repetidas = sorted({p for p in claves if claves.count(p) > 1})
+    if repetidas:
+        raise ValueError(f'patentes repetidas en la carga: {", ".join(repetidas)}')
+    
+    # La restricción única de la patente normalizada decide: un INSERT por vehículo y un solo commit
+    vehiculos = [Vehiculo(**d) for d in datos]
+    db.session.add_all(vehiculos)
+    db.session.flush()
+    # Leídos antes del commit, que expira los objetos y obligaría a releer cada uno
+    agregados = [{'id': v.id, 'patente': v.patente, 'cliente': v.cliente} for v in vehiculos]
+    db.session.commit()
+    
+    version = versiones.de_la_sesion('vehiculo')
+    for vehiculo in agregados:
+        indice_prefijos.agregar(vehiculo['patente'], vehiculo['cliente'], version)
+        version = None
+    return agregados
+
+def mensaje_patente_existente(filas):
+    return 'La patente ya existe en el sistema' if len(filas) == 1 else 'Alguna de las patentes ya existe en el sistema'
+
+# Índices únicos de la patente del vehículo: nombre en MySQL y columnas en SQLite
+INDICES_PATENTE = ('ix_vehiculo_patente_norm', 'patente')
+COLUMNAS_PATENTE = ('vehiculo.patente_norm', 'vehiculo.patente')
+
+def es_patente_repetida(error):
+    """Si un IntegrityError viene de la restricción única de la patente del vehículo
+    (no de otra restricción que mencione la columna, como NOT NULL)"""
+    mensaje = str(error.orig)
+    # SQLite: UNIQUE constraint failed: vehiculo.patente_norm
+    if mensaje.startswith('UNIQUE constraint failed:'):
+        return mensaje.split(':', 1)[1].strip() in COLUMNAS_PATENTE
+    # MySQL: (1062, "Duplicate entry 'AB123CD' for key 'vehiculo.ix_vehiculo_patente_norm'")
+    argumentos = getattr(error.orig, 'args', ())
+    if argumentos and argumentos[0] == 1062:
+        indice = re.search(r"for key '(?:vehiculo\.)?([^']+)'", mensaje)
+        return indice is not None and indice.group(1) in INDICES_PATENTE
+    return False
+
+@bp.route('/vehiculos/agregar', methods=['POST'])
+def agregar_vehiculo():
+    # Cada campo puede repetirse para cargar varios vehículos a la vez
+    columnas = ('cliente', 'modelo', 'lugar_compra', 'color', 'patente')
+    valores = [request.form.getlist(columna) for columna in columnas]
+    filas = [dict(zip(columnas, fila)) for fila in zip(*valores)]
+    try:
+        if not filas:
+            raise ValueError('no se recibió ningún vehículo')
+        vehiculos = agregar_vehiculos(filas)
+        if len(vehiculos) == 1:
+            flash('Vehículo agregado exitosamente', 'success')
+        else:
+            flash(f'{len(vehiculos)} vehículos agregados exitosamente', 'success')
+    except IntegrityError as e:
+        db.session.rollback()
+        if not es_patente_repetida(e):
+            metricas.error(e)
+            flash(f'Error al agregar vehículo: {str(e.orig)}', 'error')
+        else:
+            flash(mensaje_patente_existente(filas), 'error')
+    except Exception as e:
+        metricas.error(e)
+        db.session.rollback()
+        flash(f'Error al agregar vehículo: {str(e)}', 'error')
+    
+    return redirect(url_for('main.vehiculos'))
+
+@bp.route('/api/vehiculos', methods=['POST'])
+def api_agregar_vehiculos():
+    """API para agregar uno o varios vehículos en una sola transacción"""
+    datos = request.get_json(silent=True)
+    filas = datos.get('vehiculos', [datos]) if isinstance(datos, dict) else datos
+    if not isinstance(filas, list) or not filas or not all(isinstance(f, dict) for f in filas):
+        return {'success': False, 'error': 'se espera un vehículo o una lista de vehículos en JSON'}, 400
+    try:
+        vehiculos = agregar_vehiculos(filas)
+    except IntegrityError as e:
+        db.session.rollback()
+        if es_patente_repetida(e):
+            return {'success': False, 'error': mensaje_patente_existente(filas)}, 409
+        metricas.error(e)
+        return {'success': False, 'error': str(e.orig)}, 500
+    except ValueError as e:
+        db.session.rollback()
+        return {'success': False, 'error': str(e)}, 400
+    except Exception as e:
+        metricas.error(e)
+        db.session.rollback()
+        return {'success': False, 'error': str(e)}, 500
+    return {'success': True, 'vehiculos': vehiculos}, 201
 
-@app.route('/vehiculos/eliminar/<int:id>')
+@bp.route('/vehiculos/importar', methods=['POST'])
+def importar_vehiculos():
+    """Importar vehículos desde un archivo CSV subido en el formulario"""
+    archivo = request.files.get('archivo')
+    if not archivo or not archivo.filename:
+        flash('Seleccione un archivo CSV para importar', 'error')
+        return redirect(url_for('main.vehiculos'))
+    
+    try:
+        resultado = importar_vehiculos_csv(io.TextIOWrapper(archivo.stream, encoding='utf-8-sig', newline=''))
+        flash(f'Importación terminada: {resultado.resumen()}', 'success')
+        if resultado.rechazos:
+            detalle = '; '.join(f'línea {linea}: {motivo}' for linea, motivo in resultado.rechazos[:10])
+            mas = f' (y {len(resultado.rechazos) - 10} más)' if len(resultado.rechazos) > 10 else ''
+            flash(f'Filas rechazadas: {detalle}{mas}', 'error')
+    except Exception as e:
+        metricas.error(e)
+        flash(f'Error al importar vehículos: {str(e)}', 'error')
+    
+    return redirect(url_for('main.vehiculos'))
+
+@bp.route('/vehiculos/eliminar/<int:id>')
 def eliminar_vehiculo(id):
     try:
         vehiculo = Vehiculo.query.get_or_404(id)
+        patente = vehiculo.patente
         db.session.delete(vehiculo)
         db.session.commit()
+        indice_prefijos.eliminar(patente, versiones.de_la_sesion('vehiculo'))
         flash('Vehículo eliminado exitosamente', 'success')
     except Exception as e:
+        metricas.error(e)
         db.session.rollback()
         flash(f'Error al eliminar vehículo: {str(e)}', 'error')
     
-    return redirect(url_for('vehiculos'))
+    return redirect(url_for('main.vehiculos'))
 
-@app.route('/gestoria')
+@bp.route('/gestoria')
 def gestoria():
     try:
         # Obtener parámetros de filtro
         cliente_filter = request.args.get('cliente', '')
         patente_filter = request.args.get('patente', '')
         
-        # Construir consulta base
-        query = Gestoria.query
+        # Construir consulta con los filtros presentes
+        query = filtrar_cliente_patente(filas_listado(Gestoria), Gestoria, request.args)
         
-        # Aplicar filtros si están presentes
-        if cliente_filter:
-            query = query.filter(Gestoria.cliente.ilike(f'%{cliente_filter}%'))
-        if patente_filter:
-            query = query.filter(Gestoria.patente.ilike(f'%{patente_filter.upper()}%'))
+        # Listado completo sin paginar, enviado a medida que se leen las filas
+        if request.args.get('todo') == '1':
+            return listado_completo(query, Gestoria.fecha_creacion, Gestoria.id,
+                                    '_filas_gestoria.html', 'Gestoría')
         
-        # Ordenar por fecha de creación (más reciente primero)
-        gestoria_list = query.order_by(Gestoria.fecha_creacion.desc()).all()
+        def consultar():
+            # Paginar por fecha de creación (más reciente primero)
+            gestoria_list = obtener_pagina(query, Gestoria.fecha_creacion, Gestoria.id)
+            return dict(gestoria_list=gestoria_list, cliente_filter=cliente_filter, patente_filter=patente_filter)
         
         return render_template('gestoria.html', 
-                             gestoria_list=gestoria_list, 
+                             ultimo_cambio=cambios.ultimo(),
+                             tabla=tabla_cacheada(Gestoria, '_tabla_gestoria.html', consultar),
                              cliente_filter=cliente_filter, 
                              patente_filter=patente_filter)
     except Exception as e:
+        metricas.error(e)
         flash(f'Error al cargar gestoría: {str(e)}', 'error')
-        return render_template('gestoria.html', gestoria_list=[], cliente_filter='', patente_filter='')
+        tabla = render_template('_tabla_gestoria.html', gestoria_list=Pagina([]), cliente_filter='', patente_filter='')
+        return render_template('gestoria.html', tabla=Markup(tabla), cliente_filter='', patente_filter='')
 
-@app.route('/gestoria/agregar', methods=['POST'])
+@bp.route('/gestoria/agregar', methods=['POST'])
 def agregar_gestoria():
     if request.method == 'POST':
         try:
             cliente = request.form['cliente']
-            patente = request.form['patente'].upper()
+            patente = request.form['patente'].strip().upper()
+            validar_patente(patente)
             papeles_recibidos = request.form['papeles_recibidos']
             observaciones = request.form['observaciones']
             
@@ -192,12 +741,13 @@ def agregar_gestoria():
             db.session.commit()
             flash('Gestoría agregada exitosamente', 'success')
         except Exception as e:
+            metricas.error(e)
             db.session.rollback()
             flash(f'Error al agregar gestoría: {str(e)}', 'error')
         
-        return redirect(url_for('gestoria'))
+        return redirect(url_for('main.gestoria'))
 
-@app.route('/gestoria/eliminar/<int:id>')
+@bp.route('/gestoria/eliminar/<int:id>')
 def eliminar_gestoria(id):
     try:
         gestoria = Gestoria.query.get_or_404(id)
@@ -205,44 +755,50 @@ def eliminar_gestoria(id):
         db.session.commit()
         flash('Gestoría eliminada exitosamente', 'success')
     except Exception as e:
+        metricas.error(e)
         db.session.rollback()
         flash(f'Error al eliminar gestoría: {str(e)}', 'error')
     
-    return redirect(url_for('gestoria'))
+    return redirect(url_for('main.gestoria'))
 
-@app.route('/entrega-papeles')
+@bp.route('/entrega-papeles')
 def entrega_papeles():
     try:
         # Obtener parámetros de filtro
         cliente_filter = request.args.get('cliente', '')
         patente_filter = request.args.get('patente', '')
         
-        # Construir consulta base
-        query = EntregaPapeles.query
+        # Construir consulta con los filtros presentes
+        query = filtrar_cliente_patente(filas_listado(EntregaPapeles), EntregaPapeles, request.args)
         
-        # Aplicar filtros si están presentes
-        if cliente_filter:
-            query = query.filter(EntregaPapeles.cliente.ilike(f'%{cliente_filter}%'))
-        if patente_filter:
-            query = query.filter(EntregaPapeles.patente.ilike(f'%{patente_filter.upper()}%'))
+        # Listado completo sin paginar, enviado a medida que se leen las filas
+        if request.args.get('todo') == '1':
+            return listado_completo(query, EntregaPapeles.fecha_creacion, EntregaPapeles.id,
+                                    '_filas_entrega_papeles.html', 'Entrega de Papeles')
         
-        # Ordenar por fecha de creación (más reciente primero)
-        entrega_list = query.order_by(EntregaPapeles.fecha_creacion.desc()).all()
+        def consultar():
+            # Paginar por fecha de creación (más reciente primero)
+            entrega_list = obtener_pagina(query, EntregaPapeles.fecha_creacion, EntregaPapeles.id)
+            return dict(entrega_list=entrega_list, cliente_filter=cliente_filter, patente_filter=patente_filter)
         
         return render_template('entrega_papeles.html', 
-                             entrega_list=entrega_list, 
+                             ultimo_cambio=cambios.ultimo(),
+                             tabla=tabla_cacheada(EntregaPapeles, '_tabla_entrega_papeles.html', consultar),
                              cliente_filter=cliente_filter, 
                              patente_filter=patente_filter)
     except Exception as e:
+        metricas.error(e)
         flash(f'Error al cargar entregas: {str(e)}', 'error')
-        return render_template('entrega_papeles.html', entrega_list=[], cliente_filter='', patente_filter='')
+        tabla = render_template('_tabla_entrega_papeles.html', entrega_list=Pagina([]), cliente_filter='', patente_filter='')
+        return render_template('entrega_papeles.html', tabla=Markup(tabla), cliente_filter='', patente_filter='')
 
-@app.route('/entrega-papeles/agregar', methods=['POST'])
+@bp.route('/entrega-papeles/agregar', methods=['POST'])
 def agregar_entrega():
     if request.method == 'POST':
         try:
             cliente = request.form['cliente']
-            patente = request.form['patente'].upper()
+            patente = request.form['patente'].strip().upper()
+            validar_patente(patente)
             fecha_entrega = datetime.strptime(request.form['fecha_entrega'], '%Y-%m-%d').date()
             documentacion_entregada = request.form['documentacion_entregada']
             
@@ -256,12 +812,13 @@ def agregar_entrega():
             db.session.commit()
             flash('Entrega de papeles agregada exitosamente', 'success')
         except Exception as e:
+            metricas.error(e)
             db.session.rollback()
             flash(f'Error al agregar entrega: {str(e)}', 'error')
         
-        return redirect(url_for('entrega_papeles'))
+        return redirect(url_for('main.entrega_papeles'))
 
-@app.route('/entrega-papeles/eliminar/<int:id>')
+@bp.route('/entrega-papeles/eliminar/<int:id>')
 def eliminar_entrega(id):
     try:
         entrega = EntregaPapeles.query.get_or_404(id)
@@ -269,52 +826,162 @@ def eliminar_entrega(id):
         db.session.commit()
         flash('Entrega de papeles eliminada exitosamente', 'success')
     except Exception as e:
+        metricas.error(e)
         db.session.rollback()
         flash(f'Error al eliminar entrega: {str(e)}', 'error')
     
-    return redirect(url_for('entrega_papeles'))
+    return redirect(url_for('main.entrega_papeles'))
+
+# Listado al que vuelve cada tabla después de eliminar
+LISTADOS = {
+    'vehiculo': 'main.vehiculos',
+    'gestoria': 'main.gestoria',
+    'entrega_papeles': 'main.entrega_papeles',
+    'papeles_retirar': 'main.papeles_retirar',
+}
+
+@bp.route('/datos/eliminar-seleccionados', methods=['POST'])
+def eliminar_seleccionados():
+    """Eliminar los registros marcados en un listado (formulario o JSON)"""
+    datos = request.get_json(silent=True) if request.is_json else None
+    if datos is not None and not isinstance(datos, dict):
+        return {'success': False, 'error': 'se esperaba un objeto JSON con tabla e ids'}, 400
+    if datos is not None:
+        tabla, ids = datos.get('tabla'), datos.get('ids') or []
+    else:
+        tabla, ids = request.form.get('tabla'), request.form.getlist('ids')
+    
+    try:
+        if not isinstance(tabla, str) or tabla not in MODELOS:
+            raise ValueError(f'tabla desconocida: {tabla}')
+        if not isinstance(ids, list):
+            raise ValueError('ids debe ser una lista')
+        eliminados = eliminar_seleccionados_de(MODELOS[tabla], ids)
+    except ValueError as e:
+        if datos is not None:
+            return {'success': False, 'error': str(e)}, 400
+        flash(f'Error al eliminar los registros: {str(e)}', 'error')
+        return redirect(url_for(LISTADOS.get(tabla, 'main.vehiculos')))
+    except Exception as e:
+        metricas.error(e)
+        db.session.rollback()
+        if datos is not None:
+            return {'success': False, 'error': str(e)}, 500
+        flash(f'Error al eliminar los registros: {str(e)}', 'error')
+        return redirect(url_for(LISTADOS.get(tabla, 'main.vehiculos')))
+    
+    if datos is not None:
+        return {'success': True, 'eliminados': eliminados}
+    if eliminados:
+        flash(f'{eliminados} registro(s) eliminado(s) exitosamente', 'success')
+    else:
+        flash('No se eliminó ningún registro', 'error')
+    # Volver a la misma página del listado (sólo rutas locales)
+    volver = request.form.get('volver', '')
+    if not volver.startswith('/') or volver.startswith('//'):
+        volver = url_for(LISTADOS[tabla])
+    return redirect(volver)
 
-@app.route('/datos/exportar')
+@bp.route('/datos/exportar')
 def exportar_datos():
-    """Exportar todos los datos a un formato legible"""
+    """Exportar los datos en CSV o NDJSON como una descarga en streaming"""
+    tabla = request.args.get('tabla', 'todas')
+    formato = request.args.get('formato', 'ndjson')
+    comprimir = request.args.get('gzip') == '1'
+    
     try:
-        vehiculos_count = Vehiculo.query.count()
-        gestoria_count = Gestoria.query.count()
-        entrega_count = EntregaPapeles.query.count()
-        total_registros = vehiculos_count + gestoria_count + entrega_count
+        if formato not in FORMATOS:
+            raise ValueError(f'formato no soportado: {formato}')
+        if tabla == 'todas':
+            modelos = list(MODELOS.values())
+        elif tabla in MODELOS:
+            modelos = [MODELOS[tabla]]
+        else:
+            raise ValueError(f'tabla desconocida: {tabla}')
+        if formato == 'csv' and len(modelos) > 1:
+            raise ValueError('el formato CSV exporta una tabla por vez')
         
-        flash(f'Datos exportados: {total_registros} registros totales (Vehículos: {vehiculos_count}, Gestoría: {gestoria_count}, Entregas: {entrega_count})', 'success')
-        return redirect(url_for('vehiculos'))
-    except Exception as e:
+        # Exportación incremental: since=<id> (una tabla) o since=<fecha ISO>
+        desde = interpretar_desde(request.args.get('since'))
+        if isinstance(desde, int) and len(modelos) > 1:
+            raise ValueError('since con un id requiere indicar la tabla')
+        
+        # Corte fijo para que la exportación sea consistente con el próximo since
+        hastas = limites_superiores(db.session, modelos, desde, current_app.config['EXPORTACION_ESPERA_HUECO'])
+    except ValueError as e:
         flash(f'Error al exportar datos: {str(e)}', 'error')
-        return redirect(url_for('vehiculos'))
+        return redirect(url_for('main.vehiculos'))
+    
+    tipo, extension = FORMATOS[formato]
+    nombre = f'{tabla}.{extension}' + ('.gz' if comprimir else '')
+    respuesta = Response(
+        stream_with_context(exportar(db.session, modelos, formato, desde, hastas, comprimir)),
+        mimetype='application/gzip' if comprimir else tipo
+    )
+    respuesta.headers['Content-Disposition'] = f'attachment; filename={nombre}'
+    respuesta.headers['X-Exportacion-Hasta'] = ','.join(f'{t}={i}' for t, i in hastas.items())
+    return respuesta
 
-@app.route('/datos/limpiar')
+@bp.route('/datos/limpiar')
 def limpiar_datos():
     """Limpiar todos los datos (solo para desarrollo)"""
+    if not reinicio_permitido():
+        flash('La limpieza de datos está deshabilitada en producción', 'error')
+        return redirect(url_for('main.vehiculos'))
+    
     try:
-        # Eliminar todos los registros
-        Vehiculo.query.delete()
-        Gestoria.query.delete()
-        EntregaPapeles.query.delete()
-        db.session.commit()
-        
+        reiniciar_datos()
         flash('Todos los datos han sido limpiados de la base de datos', 'success')
     except Exception as e:
+        metricas.error(e)
         db.session.rollback()
         flash(f'Error al limpiar datos: {str(e)}', 'error')
     
-    return redirect(url_for('vehiculos'))
+    return redirect(url_for('main.vehiculos'))
 
-@app.route('/api/vehiculos')
+def datos_dashboard():
+    """Totales, altas por día y retiros vencidos leídos de las tablas de resumen"""
+    return {
+        'totales': resumen.totales(),
+        'por_dia': resumen.por_dia(current_app.config['DASHBOARD_DIAS']),
+        'vencidos': resumen.vencidos_por_lugar(current_app.config['DIAS_VENCIMIENTO_RETIRO']),
+    }
+
+@bp.route('/dashboard')
+def dashboard():
+    """Tablero con el resumen de todas las tablas"""
+    return render_template('dashboard.html',
+                         dias_vencimiento=current_app.config['DIAS_VENCIMIENTO_RETIRO'],
+                         **datos_dashboard())
+
+@bp.route('/api/dashboard')
+def api_dashboard():
+    """API con el resumen del tablero"""
+    datos = datos_dashboard()
+    return {
+        'success': True,
+        'totales': datos['totales'],
+        'por_dia': [{'dia': dia.isoformat(), **cantidades} for dia, cantidades in datos['por_dia'].items()],
+        'vencidos': [{'lugar_registro': lugar, 'cantidad': cantidad} for lugar, cantidad in datos['vencidos']],
+    }
+
+@bp.route('/api/vehiculos')
 def api_vehiculos():
     """API para obtener vehículos para autocompletado"""
-    try:
-        # Obtener todos los vehículos con cliente y patente
-        vehiculos = Vehiculo.query.with_entities(
+    texto = request.args.get('q', '').strip()
+    
+    def consultar(version):
+        # Obtener los vehículos con cliente y patente, opcionalmente filtrados
+        query = Vehiculo.query.with_entities(
             Vehiculo.cliente, 
             Vehiculo.patente
-        ).all()
+        )
+        if texto:
+            condiciones = [indice_busqueda.contiene(Vehiculo.cliente, texto)]
+            if normalizar_patente(texto):
+                condiciones.append(prefijo_patente(Vehiculo.patente_norm, texto))
+            query = query.filter(db.or_(*condiciones))
+        vehiculos = query.all()
         
         # Convertir a formato JSON
         vehiculos_data = [
@@ -326,57 +993,261 @@ def api_vehiculos():
         ]
         
         return {'success': True, 'vehiculos': vehiculos_data}
+    
+    try:
+        return respuesta_condicional('vehiculo', consultar, texto)
+    except Exception as e:
+        metricas.error(e)
+        return {'success': False, 'error': str(e)}, 500
+
+# Columna de orden de la API de datos (más reciente primero, como los listados)
+ORDEN_API = {
+    'vehiculo': Vehiculo.fecha_creacion,
+    'gestoria': Gestoria.fecha_creacion,
+    'entrega_papeles': EntregaPapeles.fecha_creacion,
+    'papeles_retirar': PapelesRetirar.fecha_presentacion,
+}
+
+@bp.route('/api/datos/<tabla>')
+def api_datos(tabla):
+    """API de lectura paginada por cursor, con los filtros de los listados y selección de campos"""
+    if tabla not in MODELOS:
+        return {'success': False, 'error': f'tabla desconocida: {tabla}'}, 404
+    modelo = MODELOS[tabla]
+    columnas = modelo.__table__.columns
+    hoy = fechas.hoy()
+    calculados = {'dias_transcurridos': dias_desde_presentacion(hoy)} if modelo is PapelesRetirar else {}
+    
+    # fields=cliente,patente: sólo se leen de la base las columnas pedidas
+    campos = [campo.strip() for campo in request.args.get('fields', '').split(',') if campo.strip()]
+    campos = list(dict.fromkeys(campos)) or list(columnas.keys())
+    desconocidos = [campo for campo in campos if campo not in columnas and campo not in calculados]
+    if desconocidos:
+        return {'success': False, 'error': f'campos desconocidos: {", ".join(desconocidos)}',
+                'campos_disponibles': [*columnas.keys(), *calculados]}, 400
+    try:
+        limite = int(request.args.get('limit', current_app.config['API_LIMITE']))
+    except ValueError:
+        return {'success': False, 'error': 'limit debe ser un número'}, 400
+    limite = max(1, min(limite, current_app.config['API_LIMITE_MAXIMO']))
+    
+    # Las columnas de orden se leen siempre porque forman el cursor
+    orden = ORDEN_API[tabla]
+    entidades = [columnas[campo] if campo in columnas else calculados[campo].label(campo) for campo in campos]
+    entidades += [columna for columna in (orden, modelo.id) if columna.key not in campos]
+    query = modelo.query.with_entities(*entidades)
+    if modelo is PapelesRetirar:
+        query = filtrar_papeles_retirar(query, request.args, hoy)
+    else:
+        query = filtrar_cliente_patente(query, modelo, request.args)
+    
+    def consultar(version):
+        # Las filas se serializan directamente, sin construir objetos del modelo
+        pagina = paginar(query, orden, modelo.id, limite,
+                         despues=request.args.get('despues'), antes=request.args.get('antes'))
+        return {
+            'success': True,
+            'tabla': tabla,
+            'campos': campos,
+            'registros': [{campo: valor_serializable(fila._mapping[campo]) for campo in campos} for fila in pagina],
+            'siguiente': pagina.cursor_siguiente,
+            'anterior': pagina.cursor_anterior,
+        }
+    
+    # La antigüedad depende del día, que forma parte del ETag en papeles a retirar
+    claves = [request.query_string.decode('utf-8'), hoy.isoformat() if calculados else '']
+    try:
+        return respuesta_condicional(tabla, consultar, *claves)
+    except CursorInvalido as e:
+        return {'success': False, 'error': str(e)}, 400
+
+@bp.route('/api/vehiculos/suggest')
+def api_vehiculos_sugerencias():
+    """API de sugerencias por prefijo de patente o de cliente"""
+    try:
+        texto = request.args.get('q', '').strip()
+        limite = max(1, min(request.args.get('limit', 20, type=int), 50))
+        
+        sugerencias = obtener_indice_prefijos().sugerir(texto, limite) if texto else []
+        return {'success': True, 'sugerencias': sugerencias}
     except Exception as e:
+        metricas.error(e)
         return {'success': False, 'error': str(e)}, 500
 
-@app.route('/api/vehiculo/<patente>')
+@bp.route('/api/vehiculo/<patente>')
 def api_vehiculo_por_patente(patente):
     """API para obtener información de un vehículo por patente"""
-    try:
-        vehiculo = Vehiculo.query.filter_by(patente=patente.upper()).first()
+    patente = normalizar_patente(patente)
+    
+    def buscar():
+        vehiculo = Vehiculo.query.filter_by(patente_norm=patente).first()
+        if vehiculo is None:
+            return None
+        return {
+            'cliente': vehiculo.cliente,
+            'patente': vehiculo.patente,
+            'modelo': vehiculo.modelo,
+            'color': vehiculo.color
+        }
+    
+    def consultar(version):
+        # Con la versión en la clave, una escritura de cualquier proceso deja atrás las entradas viejas.
+        # Es por tabla, no por patente: cualquier alta o baja de vehículos vacía la caché en la práctica,
+        # a cambio de no servir nunca datos de otro proceso desactualizados. La versión ya se lee para el ETag.
+        vehiculo = cache_patentes.obtener((version, patente), buscar)
         
         if vehiculo:
-            return {
-                'success': True, 
-                'vehiculo': {
-                    'cliente': vehiculo.cliente,
-                    'patente': vehiculo.patente,
-                    'modelo': vehiculo.modelo,
-                    'color': vehiculo.color
-                }
-            }
+            return {'success': True, 'vehiculo': vehiculo}
         else:
             return {'success': False, 'error': 'Vehículo no encontrado'}, 404
-            
+    
+    try:
+        return respuesta_condicional('vehiculo', consultar, patente)
     except Exception as e:
+        metricas.error(e)
         return {'success': False, 'error': str(e)}, 500
 
-@app.route('/papeles_retirar')
+@bp.route('/api/cache/patentes')
+def api_cache_patentes():
+    """API con las estadísticas de la caché de búsqueda por patente"""
+    return {'success': True, 'cache': cache_patentes.estadisticas()}
+
+@bp.route('/api/cache/fragmentos')
+def api_cache_fragmentos():
+    """API con las estadísticas de la caché de tablas renderizadas"""
+    return {'success': True, 'cache': cache_fragmentos.estadisticas()}
+
+@bp.route('/metrics')
+def metrics():
+    """Métricas en el formato de texto de Prometheus"""
+    return Response(metricas.exponer(), mimetype='text/plain; version=0.0.4')
+
+# Plantilla con la macro fila() de cada listado, para enviar las altas ya renderizadas
+FILAS_LISTADO = {
+    'vehiculo': '_filas_vehiculos.html',
+    'gestoria': '_filas_gestoria.html',
+    'entrega_papeles': '_filas_entrega_papeles.html',
+    'papeles_retirar': '_filas_papeles_retirar.html',
+}
+
+def filas_nuevas(tabla, ids):
+    """HTML de la fila de cada registro, igual al del listado; omite los ya eliminados"""
+    modelo = MODELOS[tabla]
+    calculadas, argumentos = {}, ()
+    if modelo is PapelesRetirar:
+        calculadas['dias_transcurridos'] = dias_desde_presentacion(fechas.hoy())
+        argumentos = (current_app.config['DIAS_VENCIMIENTO_RETIRO'],)
+    fila = get_template_attribute(FILAS_LISTADO[tabla], 'fila')
+    registros = filas_listado(modelo, **calculadas).filter(modelo.id.in_(ids)).all()
+    return {registro.id: str(fila(registro, *argumentos)) for registro in registros}
+
+def flujo_cambios(tablas, ultimo):
+    """Eventos SSE con las altas y bajas de las tablas indicadas posteriores a `ultimo`.
+
+    Si ya hay CAMBIOS_MAX_FLUJOS streams abiertos en el proceso, se envía
+    sólo lo pendiente y el navegador vuelve a consultar a los
+    CAMBIOS_SONDEO_MS: sondeo en lugar de conexión abierta, sin ocupar un hilo.
+    """
+    config = current_app.config
+    abierto = limite_flujos.tomar()
+    try:
+        duracion = config['CAMBIOS_DURACION'] if abierto else 0
+        yield f'retry: {config["CAMBIOS_REINTENTO_MS"] if abierto else config["CAMBIOS_SONDEO_MS"]}\n\n'
+        yield from eventos_cambios(tablas, ultimo, duracion)
+    finally:
+        if abierto:
+            limite_flujos.liberar()
+
+def eventos_cambios(tablas, ultimo, duracion):
+    """Bloques SSE de cada sondeo al diario durante `duracion` segundos"""
+    config = current_app.config
+    enviado, ultimo_envio = ultimo, time.monotonic()
+    for ultimo, eventos in cambios.seguir(ultimo, config['CAMBIOS_INTERVALO'], duracion,
+                                          config['CAMBIOS_ESPERA_HUECO']):
+        eventos = [evento for evento in eventos if evento['tabla'] in tablas or evento['tabla'] is None]
+        altas = {}
+        for tabla in tablas:
+            ids = [evento['registro_id'] for evento in eventos
+                   if evento['tabla'] == tabla and evento['operacion'] == ALTA]
+            if ids:
+                altas[tabla] = filas_nuevas(tabla, ids)
+        # No retener una conexión de la sesión mientras el stream espera
+        db.session.remove()
+
+        bloques = []
+        for evento in eventos:
+            datos = {'tabla': evento['tabla'], 'operacion': evento['operacion'], 'id': evento['registro_id']}
+            if evento['operacion'] == ALTA:
+                datos['html'] = altas[evento['tabla']].get(evento['registro_id'])
+                if datos['html'] is None:
+                    continue  # eliminado después del alta: su baja llega en este u otro lote
+            bloques.append(f'id: {evento["id"]}\nevent: cambio\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n')
+            enviado = evento['id']
+        if ultimo != enviado:
+            # Un id sin datos actualiza Last-Event-ID aunque no haya eventos para estas tablas
+            bloques.append(f'id: {ultimo}\n\n')
+            enviado = ultimo
+        elif time.monotonic() - ultimo_envio >= config['CAMBIOS_LATIDO']:
+            bloques.append(': latido\n\n')
+        if bloques:
+            ultimo_envio = time.monotonic()
+            yield ''.join(bloques)
+
+@bp.route('/eventos')
+def eventos():
+    """Stream SSE de altas y bajas; se retoma desde Last-Event-ID o ?desde="""
+    tablas = [tabla for tabla in request.args.get('tablas', '').split(',') if tabla in MODELOS] or list(MODELOS)
+    desde = request.headers.get('Last-Event-ID') or request.args.get('desde')
+    try:
+        ultimo = int(desde) if desde else cambios.ultimo()
+    except ValueError:
+        return {'success': False, 'error': f'id de evento inválido: {desde}'}, 400
+    db.session.remove()
+    return Response(stream_with_context(flujo_cambios(tablas, ultimo)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@bp.route('/papeles_retirar')
 def papeles_retirar():
     # Obtener parámetros de búsqueda
     cliente_filter = request.args.get('cliente', '')
     lugar_filter = request.args.get('lugar', '')
     patente_filter = request.args.get('patente', '')
+    vencidos_filter = request.args.get('vencidos') == '1'
+    antiguedad_filter = request.args.get('antiguedad', '')
+    if antiguedad_filter not in antiguedad.RANGOS:
+        antiguedad_filter = ''
+    dias_vencimiento = current_app.config['DIAS_VENCIMIENTO_RETIRO']
+    
+    hoy = fechas.hoy()
     
-    # Construir consulta con filtros
-    query = PapelesRetirar.query.order_by(PapelesRetirar.fecha_presentacion.desc())
+    # Construir consulta con filtros y los días transcurridos calculados en SQL
+    query = filas_listado(PapelesRetirar, dias_transcurridos=dias_desde_presentacion(hoy))
+    query = filtrar_papeles_retirar(query, request.args, hoy)
     
-    if cliente_filter:
-        query = query.filter(PapelesRetirar.cliente.ilike(f'%{cliente_filter}%'))
-    if lugar_filter:
-        query = query.filter(PapelesRetirar.lugar_registro.ilike(f'%{lugar_filter}%'))
-    if patente_filter:
-        query = query.filter(PapelesRetirar.patente.ilike(f'%{patente_filter}%'))
+    # Listado completo sin paginar, enviado a medida que se leen las filas
+    if request.args.get('todo') == '1':
+        return listado_completo(query, PapelesRetirar.fecha_presentacion, PapelesRetirar.id,
+                                '_filas_papeles_retirar.html', 'Papeles a Retirar', dias_vencimiento)
     
-    registros = query.all()
+    def consultar():
+        # Paginar por fecha de presentación (más reciente primero)
+        registros = obtener_pagina(query, PapelesRetirar.fecha_presentacion, PapelesRetirar.id)
+        return dict(registros=registros, dias_vencimiento=dias_vencimiento)
+    
+    # Los días transcurridos cambian con la fecha: el día forma parte de la clave
     return render_template('papeles_retirar.html', 
-                         registros=registros, 
+                         ultimo_cambio=cambios.ultimo(),
+                         tabla=tabla_cacheada(PapelesRetirar, '_tabla_papeles_retirar.html', consultar,
+                                              hoy, dias_vencimiento, orden=PapelesRetirar.fecha_presentacion),
                          cliente_filter=cliente_filter, 
                          lugar_filter=lugar_filter,
                          patente_filter=patente_filter,
-                         now=datetime.utcnow())
+                         vencidos_filter=vencidos_filter,
+                         antiguedad_filter=antiguedad_filter,
+                         rangos_antiguedad=antiguedad.RANGOS,
+                         dias_vencimiento=dias_vencimiento)
 
-@app.route('/agregar_papeles_retirar', methods=['POST'])
+@bp.route('/agregar_papeles_retirar', methods=['POST'])
 def agregar_papeles_retirar():
     try:
         # Obtener datos del formulario
@@ -389,7 +1260,8 @@ def agregar_papeles_retirar():
         # Validar campos obligatorios
         if not cliente or not patente or not lugar_registro or not fecha_presentacion:
             flash('Por favor complete todos los campos obligatorios', 'danger')
-            return redirect(url_for('papeles_retirar'))
+            return redirect(url_for('main.papeles_retirar'))
+        validar_patente(patente)
         
         # Crear nuevo registro
         nuevo_registro = PapelesRetirar(
@@ -405,12 +1277,13 @@ def agregar_papeles_retirar():
         
         flash('Registro de papeles a retirar agregado correctamente', 'success')
     except Exception as e:
+        metricas.error(e)
         db.session.rollback()
         flash(f'Error al agregar el registro: {str(e)}', 'danger')
     
-    return redirect(url_for('papeles_retirar'))
+    return redirect(url_for('main.papeles_retirar'))
 
-@app.route('/eliminar_papeles_retirar/<int:id>')
+@bp.route('/eliminar_papeles_retirar/<int:id>')
 def eliminar_papeles_retirar(id):
     try:
         registro = PapelesRetirar.query.get_or_404(id)
@@ -418,21 +1291,136 @@ def eliminar_papeles_retirar(id):
         db.session.commit()
         flash('Registro eliminado correctamente', 'success')
     except Exception as e:
+        metricas.error(e)
         db.session.rollback()
         flash('Error al eliminar el registro', 'danger')
     
-    return redirect(url_for('papeles_retirar'))
+    return redirect(url_for('main.papeles_retirar'))
+
+@bp.route('/expediente')
+@bp.route('/expediente/<patente>')
+def expediente(patente=None):
+    """Historial de una patente: vehículo, gestorías, entregas y papeles a retirar"""
+    if patente is None:
+        patente = normalizar_patente(request.args.get('patente'))
+        if patente:
+            return redirect(url_for('main.expediente', patente=patente))
+        return render_template('expediente.html', patente='', eventos=[], vehiculo=None)
+    
+    patente = normalizar_patente(patente)
+    try:
+        eventos = consultar_expediente(patente)
+    except Exception as e:
+        metricas.error(e)
+        flash(f'Error al cargar el expediente: {str(e)}', 'error')
+        eventos = []
+    vehiculo = next((evento for evento in eventos if evento['tipo'] == 'vehiculo'), None)
+    return render_template('expediente.html', patente=patente, eventos=eventos, vehiculo=vehiculo)
+
+@bp.route('/api/expediente/<patente>')
+def api_expediente(patente):
+    """API con el historial completo de una patente ordenado por fecha"""
+    try:
+        eventos = consultar_expediente(patente)
+        return {
+            'success': True,
+            'patente': normalizar_patente(patente),
+            'eventos': [
+                {
+                    'tipo': evento['tipo'],
+                    'id': evento['id'],
+                    'cliente': evento['cliente'],
+                    'detalle': evento['detalle'],
+                    'fecha': evento['fecha'].isoformat() if evento['fecha'] else None,
+                    'fecha_creacion': evento['fecha_creacion'].isoformat() if evento['fecha_creacion'] else None
+                }
+                for evento in eventos
+            ]
+        }
+    except Exception as e:
+        metricas.error(e)
+        return {'success': False, 'error': str(e)}, 500
+
+def buscar_texto(args):
+    """Página de resultados de la búsqueda de texto completo según los parámetros de la URL"""
+    consulta = args.get('q', '').strip()
+    tipo = args.get('tipo', '') if args.get('tipo') in MODELOS else ''
+    pagina = max(args.get('pagina', 1, type=int), 1)
+    por_pagina = current_app.config['BUSQUEDA_POR_PAGINA']
+    # Una fila de más indica si hay página siguiente sin contar el total
+    filas, buscados = texto_completo.buscar(consulta, por_pagina + 1, (pagina - 1) * por_pagina,
+                                            tablas=[tipo] if tipo else None)
+    hay_siguiente = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+    
+    # Cliente, patente y fecha de los registros encontrados: una consulta por tabla
+    registros = {}
+    for tabla in {fila.tabla for fila in filas}:
+        modelo = MODELOS[tabla]
+        ids = [fila.registro_id for fila in filas if fila.tabla == tabla]
+        consulta_tabla = db.select(modelo.id, modelo.cliente, modelo.patente, modelo.fecha_creacion).where(modelo.id.in_(ids))
+        registros[tabla] = {registro.id: registro for registro in db.session.execute(consulta_tabla)}
+    
+    resultados = []
+    for fila in filas:
+        registro = registros[fila.tabla].get(fila.registro_id)
+        if registro is None:
+            continue
+        resultados.append({
+            'tipo': fila.tabla,
+            'id': registro.id,
+            'cliente': registro.cliente,
+            'patente': registro.patente,
+            'fecha_creacion': registro.fecha_creacion,
+            'fragmento': fragmento(fila.contenido, buscados),
+        })
+    return dict(consulta=consulta, tipo=tipo, pagina=pagina, resultados=resultados, hay_siguiente=hay_siguiente,
+                sin_terminos=bool(consulta) and not buscados)
+
+@bp.route('/buscar')
+def buscar():
+    """Búsqueda de texto completo en vehículos, gestorías, entregas y papeles a retirar"""
+    try:
+        contexto = buscar_texto(request.args)
+    except Exception as e:
+        metricas.error(e)
+        flash(f'Error al buscar: {str(e)}', 'error')
+        contexto = dict(consulta=request.args.get('q', ''), tipo='', pagina=1, resultados=[],
+                        hay_siguiente=False, sin_terminos=False)
+    return render_template('buscar.html', **contexto)
+
+@bp.route('/api/buscar')
+def api_buscar():
+    """API de búsqueda de texto completo; el fragmento es HTML con los términos en <mark>"""
+    try:
+        contexto = buscar_texto(request.args)
+        return {
+            'success': True,
+            'consulta': contexto['consulta'],
+            'pagina': contexto['pagina'],
+            'hay_siguiente': contexto['hay_siguiente'],
+            'resultados': [
+                {**resultado, 'fecha_creacion': valor_serializable(resultado['fecha_creacion']),
+                 'fragmento': str(resultado['fragmento'])}
+                for resultado in contexto['resultados']
+            ]
+        }
+    except Exception as e:
+        metricas.error(e)
+        return {'success': False, 'error': str(e)}, 500
 
 if __name__ == '__main__':
+    app = create_app()
+    
     # Verificar conexión antes de ejecutar
-    if check_db_connection():
+    if check_db_connection(app):
         print("🚗 Iniciando Documentación Vehicular con base de datos MySQL...")
         print("📱 Abre tu navegador en: http://localhost:5000")
         print("🗄️  Base de datos: gestoria")
         print("👤 Usuario: root (sin contraseña)")
         print("-" * 60)
         
-        app.run(debug=True, host='0.0.0.0', port=5000)
+        app.run(debug=app.config['DEBUG'], host='0.0.0.0', port=5000)
     else:
         print("❌ No se pudo conectar a la base de datos")
         print("💡 Ejecuta 'flask db init' para configurar las migraciones")
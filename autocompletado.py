@@ -0,0 +1,143 @@
+"""
+Índice en memoria para el autocompletado de patentes y clientes por prefijo
+"""
+
+import threading
+import time
+from bisect import bisect_left, insort
+
+from busqueda import normalizar
+from patentes import normalizar_patente
+
+
+class IndicePrefijos:
+    """Listas ordenadas de claves normalizadas para buscar por prefijo.
+
+    Una búsqueda es una bisección más el recorrido de los k resultados, sin
+    tocar la base de datos. El índice se carga completo una sola vez por
+    proceso y después se mantiene con `agregar` y `eliminar`. Cada cambio
+    trae la versión de la tabla que produjo; si no es la siguiente a la que
+    refleja el índice (otro proceso escribió en el medio) el cambio se aplica
+    igual pero el índice queda desactualizado. Un índice desactualizado se
+    sigue usando hasta que pasan `intervalo_recarga` segundos desde la última
+    carga, así las escrituras de otros procesos no provocan una recarga
+    completa por cada pedido.
+    """
+
+    def __init__(self, intervalo_recarga=0):
+        self._lock = threading.RLock()
+        self._recarga = threading.Lock()
+        self._patentes = []   # (patente normalizada, patente)
+        self._clientes = []   # (palabra o nombre normalizado, patente)
+        self._vehiculos = {}  # patente -> cliente
+        self.cargado = False
+        self.version = None
+        self.cargado_en = None  # time.monotonic() de la última carga completa
+        self.intervalo_recarga = intervalo_recarga
+
+    def _claves_cliente(self, cliente):
+        nombre = normalizar(cliente).strip()
+        return {nombre} | set(nombre.split())
+
+    def cargar(self, filas, version=None):
+        """Reemplazar el contenido con pares (patente, cliente)"""
+        with self._lock:
+            self._vehiculos = {patente: cliente for patente, cliente in filas}
+            self._patentes = sorted((normalizar_patente(p), p) for p in self._vehiculos)
+            self._clientes = sorted(
+                (clave, patente)
+                for patente, cliente in self._vehiculos.items()
+                for clave in self._claves_cliente(cliente)
+            )
+            self.cargado = True
+            self.version = version
+            self.cargado_en = time.monotonic()
+
+    def vigente(self, version):
+        """Si el índice sirve para la versión indicada de la tabla: la refleja
+        exactamente, o es más viejo pero se cargó hace menos de `intervalo_recarga`"""
+        if not self.cargado:
+            return False
+        return self.version == version or time.monotonic() - self.cargado_en < self.intervalo_recarga
+
+    def recargar(self, version, leer):
+        """Cargar los pares que devuelve `leer()` si el índice no está vigente.
+        Mientras un hilo recarga, los demás siguen usando el índice actual."""
+        if not self._recarga.acquire(blocking=not self.cargado):
+            return
+        try:
+            if not self.vigente(version):
+                self.cargar(leer(), version)
+        finally:
+            self._recarga.release()
+
+    def invalidar(self):
+        with self._lock:
+            self.cargado = False
+
+    def _avanzar(self, version):
+        # La versión sólo avanza si el cambio viene justo después de la que refleja
+        # el índice; si no, faltan cambios de otro proceso y queda desactualizado
+        if version is not None and self.version is not None and version == self.version + 1:
+            self.version = version
+
+    def agregar(self, patente, cliente, version=None):
+        with self._lock:
+            if not self.cargado:
+                return
+            self._avanzar(version)
+            if patente in self._vehiculos:
+                self._quitar(patente)
+            self._vehiculos[patente] = cliente
+            insort(self._patentes, (normalizar_patente(patente), patente))
+            for clave in self._claves_cliente(cliente):
+                insort(self._clientes, (clave, patente))
+
+    def eliminar(self, patente, version=None):
+        with self._lock:
+            if not self.cargado:
+                return
+            self._avanzar(version)
+            if patente in self._vehiculos:
+                self._quitar(patente)
+
+    def _quitar(self, patente):
+        cliente = self._vehiculos.pop(patente)
+        self._borrar(self._patentes, (normalizar_patente(patente), patente))
+        for clave in self._claves_cliente(cliente):
+            self._borrar(self._clientes, (clave, patente))
+
+    @staticmethod
+    def _borrar(lista, entrada):
+        posicion = bisect_left(lista, entrada)
+        if posicion < len(lista) and lista[posicion] == entrada:
+            del lista[posicion]
+
+    @staticmethod
+    def _prefijo(lista, prefijo):
+        posicion = bisect_left(lista, (prefijo,))
+        while posicion < len(lista) and lista[posicion][0].startswith(prefijo):
+            yield lista[posicion][1]
+            posicion += 1
+
+    def sugerir(self, texto, limite=20):
+        """Vehículos cuya patente, nombre de cliente o alguna palabra del
+        nombre empiezan con el texto. Primero las coincidencias por patente."""
+        prefijo_patente = normalizar_patente(texto)
+        prefijo_cliente = normalizar(texto).strip()
+        resultado = []
+        vistos = set()
+        with self._lock:
+            candidatos = []
+            if prefijo_patente:
+                candidatos.append(self._prefijo(self._patentes, prefijo_patente))
+            if prefijo_cliente:
+                candidatos.append(self._prefijo(self._clientes, prefijo_cliente))
+            for grupo in candidatos:
+                for patente in grupo:
+                    if patente not in vistos:
+                        vistos.add(patente)
+                        resultado.append({'patente': patente, 'cliente': self._vehiculos[patente]})
+                        if len(resultado) >= limite:
+                            return resultado
+        return resultado
@@ -0,0 +1,11 @@
+"""
+Benchmarks reproducibles de las rutas de la aplicación
+
+    python -m benchmarks.datos --escala 100k                   # sólo cargar datos
+    python -m benchmarks.ejecutar --escala 1k                  # cargar, medir y guardar JSON
+    python -m benchmarks.ejecutar --escala 1k --base benchmarks/base_1k_sqlite.json
+    python -m benchmarks.filas --filas 10000                   # ORM contra filas livianas
+
+Con `--config testing` (por defecto) se usa SQLite en memoria, o la base de
+TEST_DATABASE_URL (por ejemplo una base MySQL vacía de pruebas).
+"""
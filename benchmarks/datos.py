@@ -0,0 +1,209 @@
+"""
+Generador de datos sintéticos con semilla fija
+
+Genera vehículos con patentes argentinas de los dos formatos (ABC123 y
+Mercosur AB123CD), clientes, trámites de gestoría, entregas y papeles a
+retirar. Con la misma semilla y escala los datos son siempre los mismos.
+"""
+
+import argparse
+import random
+import string
+import time
+from datetime import datetime, timedelta
+
+# Vehículos por escala; el resto de las tablas se dimensiona en proporción
+ESCALAS = {
+    '1k': 1_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+NOMBRES = ('Juan', 'María', 'Carlos', 'Ana', 'Jorge', 'Lucía', 'Martín', 'Sofía', 'Diego', 'Valentina',
+           'Pablo', 'Camila', 'Federico', 'Florencia', 'Matías', 'Agustina', 'Nicolás', 'Julieta',
+           'Sebastián', 'Paula', 'Gustavo', 'Romina', 'Hernán', 'Natalia')
+APELLIDOS = ('González', 'Rodríguez', 'Gómez', 'Fernández', 'López', 'Díaz', 'Martínez', 'Pérez',
+             'García', 'Sánchez', 'Romero', 'Sosa', 'Álvarez', 'Torres', 'Ruiz', 'Ramírez', 'Flores',
+             'Acosta', 'Benítez', 'Medina', 'Herrera', 'Suárez', 'Aguirre', 'Giménez', 'Gutiérrez')
+MODELOS = ('Gol Trend', 'Corolla', 'Hilux', 'Cronos', '208', 'Onix', 'Amarok', 'Ranger', 'Etios',
+           'Sandero', 'Kangoo', 'Partner', 'Focus', 'Cruze', 'Tracker', 'Duster', 'Palio', 'Fiesta')
+COLORES = ('Blanco', 'Negro', 'Gris', 'Plata', 'Rojo', 'Azul', 'Bordó', 'Verde')
+LUGARES_COMPRA = ('Malelo', 'Rayco Venado', 'Rayco San Jose', 'Rayco Marcos Juarez', 'Rayco Rosario',
+                  'Meyer', 'Quillinari', 'Cantarini', 'EVR', 'Marconeto', 'Cornara', 'Fausto',
+                  'Lingua', 'Degra', 'Otra ubicación')
+LUGARES_REGISTRO = ('Rosario N° 3', 'Rosario N° 11', 'Venado Tuerto N° 1', 'Casilda', 'Firmat',
+                    'Marcos Juárez', 'Cañada de Gómez', 'Rufino', 'Funes', 'San Lorenzo')
+PAPELES = ('Formulario 08', 'Título', 'Cédula verde', 'Cédula azul', 'Libre deuda', 'Verificación policial',
+           'Informe de dominio', 'Formulario 12')
+
+LETRAS = string.ascii_uppercase
+VIEJAS = 26 ** 3 * 1000       # ABC123
+MERCOSUR = 26 ** 4 * 1000     # AB123CD
+
+
+def patente_vieja(n):
+    letras, numero = divmod(n, 1000)
+    return ''.join(LETRAS[(letras // 26 ** i) % 26] for i in (2, 1, 0)) + f'{numero:03d}'
+
+
+def patente_mercosur(n):
+    letras, numero = divmod(n, 1000)
+    letra = [LETRAS[(letras // 26 ** i) % 26] for i in (3, 2, 1, 0)]
+    return f'{letra[0]}{letra[1]}{numero:03d}{letra[2]}{letra[3]}'
+
+
+def patentes(rnd, cantidad):
+    """Patentes distintas, mitad de cada formato, en orden aleatorio"""
+    viejas = cantidad // 2
+    lista = [patente_vieja(n) for n in rnd.sample(range(VIEJAS), viejas)]
+    lista += [patente_mercosur(n) for n in rnd.sample(range(MERCOSUR), cantidad - viejas)]
+    rnd.shuffle(lista)
+    return lista
+
+
+class Generador:
+    """Filas sintéticas reproducibles para las cuatro tablas"""
+
+    def __init__(self, escala, semilla=20251001, ahora=None):
+        self.cantidad = ESCALAS[escala] if isinstance(escala, str) else int(escala)
+        self.rnd = random.Random(semilla)
+        # Las fechas se generan relativas a hoy (al mediodía) para que la antigüedad
+        # de los papeles a retirar tenga siempre la misma distribución
+        self.ahora = ahora or datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        self.clientes = [
+            f'{self.rnd.choice(NOMBRES)} {self.rnd.choice(APELLIDOS)} {self.rnd.choice(APELLIDOS)}'
+            for _ in range(max(10, self.cantidad // 3))
+        ]
+        self.patentes = patentes(self.rnd, self.cantidad)
+        self.titulares = [self.rnd.choice(self.clientes) for _ in self.patentes]
+
+    def _fecha_creacion(self):
+        return self.ahora - timedelta(seconds=self.rnd.randrange(2 * 365 * 86400))
+
+    def _vehiculo_al_azar(self):
+        i = self.rnd.randrange(self.cantidad)
+        return self.patentes[i], self.titulares[i]
+
+    def vehiculos(self):
+        for patente, cliente in zip(self.patentes, self.titulares):
+            yield {
+                'cliente': cliente,
+                'modelo': self.rnd.choice(MODELOS),
+                'lugar_compra': self.rnd.choice(LUGARES_COMPRA),
+                'color': self.rnd.choice(COLORES),
+                'patente': patente,
+                'fecha_creacion': self._fecha_creacion(),
+            }
+
+    def gestorias(self):
+        for _ in range(self.cantidad):
+            patente, cliente = self._vehiculo_al_azar()
+            yield {
+                'cliente': cliente,
+                'patente': patente,
+                'papeles_recibidos': ', '.join(self.rnd.sample(PAPELES, self.rnd.randint(1, 3))),
+                'observaciones': self.rnd.choice((None, None, 'Falta firma del titular', 'Pendiente de pago')),
+                'fecha_creacion': self._fecha_creacion(),
+            }
+
+    def entregas(self):
+        for _ in range(self.cantidad // 2):
+            patente, cliente = self._vehiculo_al_azar()
+            creacion = self._fecha_creacion()
+            yield {
+                'cliente': cliente,
+                'patente': patente,
+                'fecha_entrega': (creacion + timedelta(days=self.rnd.randint(0, 30))).date(),
+                'documentacion_entregada': ', '.join(self.rnd.sample(PAPELES, self.rnd.randint(1, 3))),
+                'fecha_creacion': creacion,
+            }
+
+    def papeles_retirar(self):
+        for _ in range(self.cantidad // 4):
+            patente, cliente = self._vehiculo_al_azar()
+            yield {
+                'cliente': cliente,
+                'patente': patente,
+                'lugar_registro': self.rnd.choice(LUGARES_REGISTRO),
+                'fecha_presentacion': (self.ahora - timedelta(days=self.rnd.randrange(120))).date(),
+                'comentarios': self.rnd.choice((None, 'Turno confirmado', 'Observado')),
+                'fecha_creacion': self._fecha_creacion(),
+            }
+
+    def tablas(self):
+        """(nombre de tabla, generador de filas) en orden de carga"""
+        return (
+            ('vehiculo', self.vehiculos()),
+            ('gestoria', self.gestorias()),
+            ('entrega_papeles', self.entregas()),
+            ('papeles_retirar', self.papeles_retirar()),
+        )
+
+
+def _lotes(filas, por_lote):
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= por_lote:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def cargar(modulo, generador, lote=5000, vaciar=False, progreso=print):
+    """Insertar los datos generados y reconstruir índices y contadores.
+
+    `modulo` es el módulo `app` ya inicializado dentro de un contexto de
+    aplicación. Se niega a cargar sobre tablas con datos salvo con `vaciar`.
+    """
+    db = modulo.db
+    db.create_all()
+    con_datos = [nombre for nombre, modelo in modulo.MODELOS.items() if db.session.query(modelo.id).first()]
+    if con_datos:
+        if not vaciar:
+            raise RuntimeError(f'las tablas ya tienen datos: {", ".join(con_datos)} (usar --vaciar)')
+        modulo.reiniciar_datos()
+    db.session.remove()
+
+    totales = {}
+    for nombre, filas in generador.tablas():
+        tabla = modulo.MODELOS[nombre].__table__
+        inicio = time.perf_counter()
+        total = 0
+        for filas_lote in _lotes(filas, lote):
+            with db.engine.begin() as connection:
+                connection.execute(tabla.insert(), filas_lote)
+            total += len(filas_lote)
+        totales[nombre] = total
+        progreso(f'{nombre}: {total} filas en {time.perf_counter() - inicio:.1f} s')
+
+    # Las inserciones masivas no pasan por el ORM: regenerar lo que mantienen los eventos
+    inicio = time.perf_counter()
+    modulo.indice_busqueda.reconstruir()
+    modulo.resumen.recalcular()
+    with db.engine.begin() as connection:
+        modulo.versiones.incrementar(connection, list(modulo.MODELOS))
+    modulo.indice_prefijos.invalidar()
+    modulo.cache_patentes.limpiar()
+    modulo.cache_fragmentos.limpiar()
+    progreso(f'índices y contadores reconstruidos en {time.perf_counter() - inicio:.1f} s')
+    return totales
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description='Cargar datos sintéticos para benchmarks')
+    parser.add_argument('--escala', choices=ESCALAS, default='1k')
+    parser.add_argument('--semilla', type=int, default=20251001)
+    parser.add_argument('--config', default='testing', help='configuración de la app (testing = SQLite en memoria)')
+    parser.add_argument('--vaciar', action='store_true', help='vaciar las tablas si ya tienen datos')
+    args = parser.parse_args(argumentos)
+
+    import app as modulo
+    aplicacion = modulo.create_app(args.config)
+    with aplicacion.app_context():
+        cargar(modulo, Generador(args.escala, args.semilla), vaciar=args.vaciar)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,346 @@
+"""
+Medición de latencia, consultas por pedido y memoria de cada ruta
+
+Carga datos sintéticos, ejecuta cada caso con el cliente de pruebas de Flask
+y guarda p50/p95 de latencia, cantidad de consultas SQL y pico de memoria
+asignada por pedido en un JSON. Con `--base` compara contra una ejecución
+anterior y termina con código 1 si alguna ruta empeoró más de la tolerancia.
+"""
+
+import argparse
+import gc
+import io
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event
+
+from benchmarks.datos import ESCALAS, Generador, cargar, patente_mercosur
+
+
+@dataclass
+class Caso:
+    """Pedido a medir; `url` y `datos` reciben el contexto y devuelven el pedido"""
+    nombre: str
+    endpoint: str
+    url: object
+    metodo: str = 'GET'
+    datos: object = None
+    pesado: bool = False  # recorre tablas completas: se repite menos
+
+
+def _fecha(dias):
+    return (date.today() - timedelta(days=dias)).isoformat()
+
+
+# Rutas de lectura: se miden primero, con los datos sin modificar
+LECTURAS = [
+    Caso('index', 'main.index', lambda c: '/'),
+    Caso('vehiculos', 'main.vehiculos', lambda c: '/vehiculos'),
+    Caso('vehiculos_pagina_10', 'main.vehiculos', lambda c: c['url_pagina_10']),
+    Caso('vehiculos_filtro_cliente', 'main.vehiculos', lambda c: f"/vehiculos?cliente={c['apellido']}"),
+    Caso('vehiculos_filtro_patente', 'main.vehiculos', lambda c: f"/vehiculos?patente={c['patente'][:4]}"),
+    Caso('vehiculos_todo', 'main.vehiculos', lambda c: '/vehiculos?todo=1', pesado=True),
+    Caso('gestoria', 'main.gestoria', lambda c: '/gestoria'),
+    Caso('gestoria_filtro_cliente', 'main.gestoria', lambda c: f"/gestoria?cliente={c['apellido']}"),
+    Caso('entrega_papeles', 'main.entrega_papeles', lambda c: '/entrega-papeles'),
+    Caso('papeles_retirar', 'main.papeles_retirar', lambda c: '/papeles_retirar'),
+    Caso('papeles_retirar_vencidos', 'main.papeles_retirar', lambda c: '/papeles_retirar?vencidos=1'),
+    Caso('papeles_retirar_8_30', 'main.papeles_retirar', lambda c: '/papeles_retirar?antiguedad=8-30'),
+    Caso('expediente', 'main.expediente', lambda c: f"/expediente/{c['patente']}"),
+    Caso('expediente_busqueda', 'main.expediente', lambda c: '/expediente'),
+    Caso('dashboard', 'main.dashboard', lambda c: '/dashboard'),
+    Caso('api_dashboard', 'main.api_dashboard', lambda c: '/api/dashboard'),
+    Caso('api_vehiculos', 'main.api_vehiculos', lambda c: '/api/vehiculos', pesado=True),
+    Caso('api_vehiculos_q', 'main.api_vehiculos', lambda c: f"/api/vehiculos?q={c['apellido']}"),
+    Caso('api_sugerencias', 'main.api_vehiculos_sugerencias', lambda c: f"/api/vehiculos/suggest?q={c['patente'][:2]}"),
+    Caso('api_vehiculo_por_patente', 'main.api_vehiculo_por_patente', lambda c: f"/api/vehiculo/{c['patente']}"),
+    Caso('api_vehiculo_inexistente', 'main.api_vehiculo_por_patente', lambda c: '/api/vehiculo/ZZ999ZZ'),
+    Caso('api_expediente', 'main.api_expediente', lambda c: f"/api/expediente/{c['patente']}"),
+    Caso('buscar', 'main.buscar', lambda c: '/buscar?q=cedula+verde'),
+    Caso('buscar_pagina_5', 'main.buscar', lambda c: '/buscar?q=titulo&pagina=5'),
+    Caso('api_buscar', 'main.api_buscar', lambda c: f"/api/buscar?q={c['apellido']}"),
+    Caso('api_datos_gestoria', 'main.api_datos', lambda c: '/api/datos/gestoria?limit=1000'),
+    Caso('api_datos_vehiculo_campos', 'main.api_datos',
+         lambda c: '/api/datos/vehiculo?fields=patente,cliente&limit=1000'),
+    Caso('api_cache_patentes', 'main.api_cache_patentes', lambda c: '/api/cache/patentes'),
+    Caso('api_cache_fragmentos', 'main.api_cache_fragmentos', lambda c: '/api/cache/fragmentos'),
+    Caso('metrics', 'main.metrics', lambda c: '/metrics'),
+    Caso('exportar_ndjson', 'main.exportar_datos', lambda c: '/datos/exportar', pesado=True),
+    Caso('exportar_csv_gzip', 'main.exportar_datos',
+         lambda c: '/datos/exportar?tabla=vehiculo&formato=csv&gzip=1', pesado=True),
+]
+
+# Rutas de escritura: cada repetición usa datos nuevos
+ESCRITURAS = [
+    Caso('agregar_vehiculo', 'main.agregar_vehiculo', lambda c: '/vehiculos/agregar', 'POST',
+         lambda c: {'cliente': c['cliente'], 'modelo': 'Cronos', 'lugar_compra': 'Meyer',
+                    'color': 'Gris', 'patente': c['patente_nueva']()}),
+    Caso('api_agregar_vehiculos_10', 'main.api_agregar_vehiculos', lambda c: '/api/vehiculos', 'POST',
+         lambda c: {'json': [{'cliente': c['cliente'], 'modelo': 'Onix', 'lugar_compra': 'EVR',
+                              'color': 'Rojo', 'patente': c['patente_nueva']()} for _ in range(10)]}),
+    Caso('importar_vehiculos_100', 'main.importar_vehiculos', lambda c: '/vehiculos/importar', 'POST',
+         lambda c: {'archivo': (io.BytesIO(c['csv_vehiculos'](100)), 'vehiculos.csv')}),
+    Caso('agregar_gestoria', 'main.agregar_gestoria', lambda c: '/gestoria/agregar', 'POST',
+         lambda c: {'cliente': c['cliente'], 'patente': c['patente'], 'papeles_recibidos': 'Formulario 08',
+                    'observaciones': ''}),
+    Caso('agregar_entrega', 'main.agregar_entrega', lambda c: '/entrega-papeles/agregar', 'POST',
+         lambda c: {'cliente': c['cliente'], 'patente': c['patente'], 'fecha_entrega': _fecha(0),
+                    'documentacion_entregada': 'Título'}),
+    Caso('agregar_papeles_retirar', 'main.agregar_papeles_retirar', lambda c: '/agregar_papeles_retirar', 'POST',
+         lambda c: {'cliente': c['cliente'], 'patente': c['patente'], 'lugar_registro': 'Funes',
+                    'fecha_presentacion': _fecha(3), 'comentarios': ''}),
+]
+
+# Rutas de borrado: cada repetición elimina registros distintos de los generados
+BORRADOS = [
+    Caso('eliminar_vehiculo', 'main.eliminar_vehiculo', lambda c: f"/vehiculos/eliminar/{c['id']('vehiculo')}"),
+    Caso('eliminar_gestoria', 'main.eliminar_gestoria', lambda c: f"/gestoria/eliminar/{c['id']('gestoria')}"),
+    Caso('eliminar_entrega', 'main.eliminar_entrega',
+         lambda c: f"/entrega-papeles/eliminar/{c['id']('entrega_papeles')}"),
+    Caso('eliminar_papeles_retirar', 'main.eliminar_papeles_retirar',
+         lambda c: f"/eliminar_papeles_retirar/{c['id']('papeles_retirar')}"),
+    Caso('eliminar_seleccionados_20', 'main.eliminar_seleccionados', lambda c: '/datos/eliminar-seleccionados',
+         'POST', lambda c: {'json': {'tabla': 'gestoria', 'ids': [c['id']('gestoria') for _ in range(20)]}}),
+]
+
+# Rutas que no se miden
+EXCLUIDAS = {
+    'main.limpiar_datos': 'vacía todas las tablas',
+    'main.eventos': 'stream SSE que se mantiene abierto CAMBIOS_DURACION segundos',
+    'static': 'archivos estáticos',
+}
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano"""
+    ordenados = sorted(valores)
+    return ordenados[max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))]
+
+
+class ContadorConsultas:
+    """Cuenta las sentencias que el motor envía a la base"""
+
+    def __init__(self, engine):
+        self.total = 0
+        event.listen(engine, 'before_cursor_execute', self._contar)
+
+    def _contar(self, *args):
+        self.total += 1
+
+
+def contexto_de(generador, modulo, semilla):
+    """Valores que usan los casos para armar los pedidos"""
+    rnd = random.Random(semilla)
+    secuencia = iter(range(10 ** 9))
+    ids = {}
+
+    existentes = set(generador.patentes)
+
+    def patente_nueva():
+        # Desde ZZ999ZZ hacia abajo, salteando las que ya generó el generador
+        patente = patente_mercosur(26 ** 4 * 1000 - 1 - next(secuencia))
+        return patente if patente not in existentes else patente_nueva()
+
+    def csv_vehiculos(filas):
+        lineas = ['cliente,modelo,lugar_compra,color,patente']
+        lineas += [f'Importado,Gol,Meyer,Blanco,{patente_nueva()}' for _ in range(filas)]
+        return '\n'.join(lineas).encode('utf-8')
+
+    def siguiente_id(tabla):
+        # Borrar de los ids más altos hacia abajo, sin repetir
+        if tabla not in ids:
+            modelo = modulo.MODELOS[tabla]
+            ids[tabla] = iter(modulo.db.session.query(modelo.id).order_by(modelo.id.desc())
+                              .limit(10000).all())
+        return next(ids[tabla]).id
+
+    patente = rnd.choice(generador.patentes)
+    # Cursor de la página 10 del listado de vehículos
+    cursor = None
+    for _ in range(10):
+        pagina = modulo.paginar(modulo.Vehiculo.query, modulo.Vehiculo.fecha_creacion, modulo.Vehiculo.id,
+                                modulo.current_app.config['ITEMS_PER_PAGE'], despues=cursor)
+        cursor = pagina.cursor_siguiente or cursor
+    return {
+        'patente': patente,
+        'cliente': generador.titulares[generador.patentes.index(patente)],
+        'apellido': rnd.choice(generador.clientes).split()[1],
+        'url_pagina_10': f'/vehiculos?despues={cursor}' if cursor else '/vehiculos',
+        'patente_nueva': patente_nueva,
+        'csv_vehiculos': csv_vehiculos,
+        'id': siguiente_id,
+    }
+
+
+def medir(cliente, caso, contexto, repeticiones, contador):
+    """Ejecutar un caso y devolver sus métricas"""
+    def pedido():
+        datos = caso.datos(contexto) if caso.datos else None
+        opciones = {}
+        if datos and 'json' in datos:
+            opciones['json'] = datos['json']
+        elif datos:
+            opciones['data'] = datos
+        url = caso.url(contexto)
+        consultas = contador.total
+        inicio = time.perf_counter()
+        respuesta = cliente.open(url, method=caso.metodo, **opciones)
+        respuesta.get_data()  # consumir también las respuestas en streaming
+        return respuesta.status_code, time.perf_counter() - inicio, contador.total - consultas
+
+    pedido()  # calentamiento (carga de índices en memoria, plantillas compiladas)
+    if caso.pesado:
+        repeticiones = max(5, repeticiones // 5)
+    tiempos, consultas, estados = [], [], set()
+    # Como timeit: sin recolector de basura durante la medición
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeticiones):
+            estado, segundos, cantidad = pedido()
+            tiempos.append(segundos * 1000)
+            consultas.append(cantidad)
+            estados.add(estado)
+    finally:
+        gc.enable()
+
+    # Pico de memoria en una pasada aparte: tracemalloc altera los tiempos
+    tracemalloc.start()
+    pedido()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'endpoint': caso.endpoint,
+        'metodo': caso.metodo,
+        'estado': sorted(estados),
+        'repeticiones': repeticiones,
+        'p50_ms': round(percentil(tiempos, 50), 3),
+        'p95_ms': round(percentil(tiempos, 95), 3),
+        'consultas': max(consultas),
+        'memoria_pico_kb': round(pico / 1024, 1),
+    }
+
+
+def rutas_sin_caso(aplicacion):
+    """Endpoints de la aplicación que no tienen caso ni están excluidos"""
+    cubiertos = {caso.endpoint for caso in LECTURAS + ESCRITURAS + BORRADOS} | set(EXCLUIDAS)
+    return sorted({regla.endpoint for regla in aplicacion.url_map.iter_rules()} - cubiertos)
+
+
+def comparar(actual, base, tolerancia):
+    """Lista de regresiones de `actual` respecto de `base`"""
+    regresiones = []
+    for nombre, medida in actual['rutas'].items():
+        anterior = base['rutas'].get(nombre)
+        if not anterior:
+            continue
+        # p50 para la latencia: el p95 de pocas repeticiones varía demasiado entre corridas
+        if medida['p50_ms'] > anterior['p50_ms'] * (1 + tolerancia) and medida['p50_ms'] - anterior['p50_ms'] > 2:
+            regresiones.append(f"{nombre}: p50 {anterior['p50_ms']} → {medida['p50_ms']} ms")
+        if medida['consultas'] > anterior['consultas']:
+            regresiones.append(f"{nombre}: consultas {anterior['consultas']} → {medida['consultas']}")
+        if (medida['memoria_pico_kb'] > anterior['memoria_pico_kb'] * (1 + tolerancia)
+                and medida['memoria_pico_kb'] - anterior['memoria_pico_kb'] > 256):
+            regresiones.append(f"{nombre}: memoria {anterior['memoria_pico_kb']} → {medida['memoria_pico_kb']} KB")
+    return regresiones
+
+
+def imprimir(resultado, base=None):
+    print(f"{'caso':<32} {'p50 ms':>9} {'p95 ms':>9} {'base p50':>9} {'consultas':>9} {'memoria KB':>11}")
+    for nombre, medida in resultado['rutas'].items():
+        anterior = (base or {}).get('rutas', {}).get(nombre, {})
+        print(f"{nombre:<32} {medida['p50_ms']:>9.2f} {medida['p95_ms']:>9.2f} "
+              f"{anterior.get('p50_ms', '-'):>9} {medida['consultas']:>9} {medida['memoria_pico_kb']:>11.1f}")
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description='Medir las rutas de la aplicación con datos sintéticos')
+    parser.add_argument('--escala', choices=ESCALAS, default='1k')
+    parser.add_argument('--semilla', type=int, default=20251001)
+    parser.add_argument('--config', default='testing', help='configuración de la app (testing = SQLite en memoria)')
+    parser.add_argument('--repeticiones', type=int, default=30)
+    parser.add_argument('--cache-fragmentos', choices=('memoria', 'archivos', 'nulo'), default=None,
+                        help='backend de la caché de tablas (por defecto el de la configuración)')
+    parser.add_argument('--vaciar', action='store_true', help='vaciar las tablas si ya tienen datos')
+    parser.add_argument('--salida', default=None, help='archivo JSON de resultados')
+    parser.add_argument('--base', default=None, help='resultados anteriores con los que comparar')
+    parser.add_argument('--tolerancia', type=float, default=0.5,
+                        help='empeoramiento admitido de latencia y memoria (0.5 = 50%%)')
+    parser.add_argument('--casos', default=None, help='nombres de casos separados por coma')
+    args = parser.parse_args(argumentos)
+
+    import app as modulo
+    aplicacion = modulo.create_app(args.config)
+    if args.cache_fragmentos:
+        aplicacion.config['CACHE_FRAGMENTOS'] = args.cache_fragmentos
+        modulo.cache_fragmentos.configurar(args.cache_fragmentos)
+
+    with aplicacion.app_context():
+        generador = Generador(args.escala, args.semilla)
+        cargar(modulo, generador, vaciar=args.vaciar)
+        contexto = contexto_de(generador, modulo, args.semilla)
+        contador = ContadorConsultas(modulo.db.engine)
+        cliente = aplicacion.test_client()
+        motor = modulo.db.engine.dialect.name
+
+        faltantes = rutas_sin_caso(aplicacion)
+        for endpoint in faltantes:
+            print(f'⚠️  {endpoint} no tiene caso de benchmark', file=sys.stderr)
+
+        elegidos = set(args.casos.split(',')) if args.casos else None
+        rutas = {}
+        for caso in LECTURAS + ESCRITURAS + BORRADOS:
+            if elegidos and caso.nombre not in elegidos:
+                continue
+            rutas[caso.nombre] = medir(cliente, caso, contexto, args.repeticiones, contador)
+            modulo.db.session.remove()
+
+    resultado = {
+        'meta': {
+            'escala': args.escala,
+            'semilla': args.semilla,
+            'config': args.config,
+            'motor': motor,
+            'cache_fragmentos': aplicacion.config['CACHE_FRAGMENTOS'],
+            'repeticiones': args.repeticiones,
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+        },
+        'rutas': rutas,
+        'sin_caso': faltantes,
+        'excluidas': EXCLUIDAS,
+    }
+
+    base = None
+    if args.base:
+        with open(args.base, encoding='utf-8') as f:
+            base = json.load(f)
+    imprimir(resultado, base)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+        print(f'💾 Resultados guardados en {args.salida}')
+
+    if base:
+        if base['meta'].get('escala') != args.escala or base['meta'].get('motor') != resultado['meta']['motor']:
+            print('⚠️  La base se midió con otra escala o motor de base de datos', file=sys.stderr)
+        regresiones = comparar(resultado, base, args.tolerancia)
+        for regresion in regresiones:
+            print(f'❌ {regresion}')
+        if regresiones:
+            return 1
+        print('✅ Sin regresiones respecto de la base')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
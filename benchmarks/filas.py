@@ -0,0 +1,64 @@
+"""
+Comparación de lectura con instancias del ORM y con filas livianas
+
+Lee las mismas filas con `Modelo.query...all()` y con `filas_listado()`
+y compara el tiempo de CPU y el pico de memoria asignada por cada 10k filas.
+
+    python -m benchmarks.filas --filas 10000
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from benchmarks.datos import Generador, cargar
+
+
+def medir(leer, repeticiones):
+    """Mediana del tiempo de CPU y pico de memoria de `leer()`"""
+    tiempos = []
+    for _ in range(repeticiones):
+        gc.collect()
+        inicio = time.process_time()
+        leer()
+        tiempos.append(time.process_time() - inicio)
+    gc.collect()
+    tracemalloc.start()
+    leer()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return sorted(tiempos)[len(tiempos) // 2], pico
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description='Comparar instancias del ORM con filas livianas')
+    parser.add_argument('--filas', type=int, default=10000, help='vehículos a generar (y gestorías)')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--config', default='testing')
+    args = parser.parse_args(argumentos)
+
+    import app as modulo
+    aplicacion = modulo.create_app(args.config)
+    with aplicacion.app_context():
+        cargar(modulo, Generador(args.filas), vaciar=True, progreso=lambda mensaje: None)
+        escala = 10000 / args.filas
+        print(f"{'tabla':<18} {'lectura':<8} {'CPU ms/10k':>11} {'memoria KB/10k':>15}")
+        for modelo in (modulo.Vehiculo, modulo.Gestoria):
+            def orm():
+                modelo.query.order_by(modelo.fecha_creacion.desc(), modelo.id.desc()).all()
+                modulo.db.session.remove()  # como al terminar un pedido
+
+            def livianas():
+                modulo.filas_listado(modelo).order_by(modelo.fecha_creacion.desc(), modelo.id.desc()).all()
+                modulo.db.session.remove()
+
+            for nombre, leer in (('orm', orm), ('filas', livianas)):
+                leer()  # calentamiento
+                cpu, pico = medir(leer, args.repeticiones)
+                print(f'{modelo.__tablename__:<18} {nombre:<8} {cpu * 1000 * escala:>11.1f} '
+                      f'{pico / 1024 * escala:>15.1f}')
+
+
+if __name__ == '__main__':
+    main()
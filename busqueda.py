@@ -0,0 +1,133 @@
+"""
+Búsqueda por subcadena ("contiene") apoyada en un índice de trigramas
+
+Cada campo registrado se descompone en trigramas normalizados que se guardan
+en una tabla auxiliar indexada. Un filtro "contiene" busca primero los
+registros que tienen todos los trigramas del texto buscado (usando el índice)
+y sólo sobre esos candidatos aplica el `ilike` original, que descarta los
+falsos positivos y mantiene exactamente la misma semántica que antes.
+"""
+
+import unicodedata
+
+from sqlalchemy import and_, event, func, inspect, select
+
+
+def normalizar(texto):
+    """Pasar a minúsculas y quitar acentos para indexar y buscar"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def trigramas(texto):
+    """Conjunto de trigramas de un texto normalizado"""
+    texto = normalizar(texto)
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceBusqueda:
+    """Mantiene la tabla de trigramas y construye los filtros de búsqueda"""
+
+    def __init__(self, db, modelo_trigrama):
+        self.db = db
+        self.tabla = modelo_trigrama.__table__
+        self.campos = {}
+
+    def registrar(self, modelo, campos):
+        """Indexar los campos de un modelo y mantenerlos al insertar y eliminar"""
+        self.campos[modelo] = tuple(campos)
+        event.listen(modelo, 'after_insert', self._al_insertar)
+        event.listen(modelo, 'after_update', self._al_actualizar)
+        event.listen(modelo, 'after_delete', self._al_eliminar)
+
+    def _filas(self, modelo, registro_id, valores):
+        nombre = modelo.__tablename__
+        return [
+            {'tabla': nombre, 'campo': campo, 'trigrama': trigrama, 'registro_id': registro_id}
+            for campo, valor in valores.items()
+            for trigrama in trigramas(valor)
+        ]
+
+    def _al_insertar(self, mapper, connection, objetivo):
+        self.indexar(connection, type(objetivo), [objetivo])
+
+    def _al_actualizar(self, mapper, connection, objetivo):
+        modelo = type(objetivo)
+        estado = inspect(objetivo)
+        if any(estado.attrs[campo].history.has_changes() for campo in self.campos[modelo]):
+            self.desindexar(connection, modelo, [objetivo.id])
+            self.indexar(connection, modelo, [objetivo])
+
+    def _al_eliminar(self, mapper, connection, objetivo):
+        self.desindexar(connection, type(objetivo), [objetivo.id])
+
+    def indexar(self, connection, modelo, registros, ignorar_duplicados=False):
+        """Insertar los trigramas de registros (objetos o filas con id y campos)"""
+        filas = []
+        for registro in registros:
+            valores = {campo: getattr(registro, campo) for campo in self.campos[modelo]}
+            filas.extend(self._filas(modelo, registro.id, valores))
+        if filas:
+            insert = self.tabla.insert()
+            if ignorar_duplicados:
+                insert = insert.prefix_with('IGNORE', dialect='mysql').prefix_with('OR IGNORE', dialect='sqlite')
+            connection.execute(insert, filas)
+
+    def desindexar(self, connection, modelo, ids):
+        """Eliminar los trigramas de los registros indicados"""
+        if ids:
+            connection.execute(self.tabla.delete().where(and_(
+                self.tabla.c.tabla == modelo.__tablename__,
+                self.tabla.c.registro_id.in_(list(ids)),
+            )))
+
+    def vaciar(self, connection, modelo):
+        """Eliminar todos los trigramas de un modelo"""
+        connection.execute(self.tabla.delete().where(self.tabla.c.tabla == modelo.__tablename__))
+
+    def contiene(self, columna, texto):
+        """Filtro equivalente a `columna ILIKE '%texto%'` que usa el índice.
+
+        Con menos de tres caracteres no hay trigramas que consultar y se
+        recurre directamente al `ilike`.
+        """
+        condicion = columna.ilike(f'%{texto}%')
+        buscados = trigramas(texto)
+        if not buscados:
+            return condicion
+
+        modelo = columna.class_
+        candidatos = (
+            select(self.tabla.c.registro_id)
+            .where(
+                self.tabla.c.tabla == modelo.__tablename__,
+                self.tabla.c.campo == columna.key,
+                self.tabla.c.trigrama.in_(sorted(buscados)),
+            )
+            .group_by(self.tabla.c.registro_id)
+            .having(func.count(func.distinct(self.tabla.c.trigrama)) == len(buscados))
+        )
+        return and_(modelo.id.in_(candidatos), condicion)
+
+    def reconstruir(self, modelos=None, lote=1000):
+        """Regenerar el índice desde cero a partir de los datos existentes.
+
+        Lee cada tabla con un cursor del lado del servidor y escribe los
+        trigramas en lotes confirmados por separado. Los registros que se
+        agregan mientras tanto ya quedan indexados por los eventos, por eso
+        los duplicados se ignoran.
+        """
+        resumen = {}
+        for modelo in modelos or self.campos:
+            columnas = [modelo.id] + [getattr(modelo, campo) for campo in self.campos[modelo]]
+            with self.db.engine.connect() as lectura, self.db.engine.connect() as escritura:
+                self.vaciar(escritura, modelo)
+                escritura.commit()
+                resultado = lectura.execution_options(yield_per=lote).execute(select(*columnas))
+                total = 0
+                for particion in resultado.partitions():
+                    self.indexar(escritura, modelo, particion, ignorar_duplicados=True)
+                    escritura.commit()
+                    total += len(particion)
+            resumen[modelo.__tablename__] = total
+        return resumen
@@ -0,0 +1,113 @@
+"""
+Caché LRU en memoria con vencimiento, resultados negativos y consultas unificadas
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Consulta:
+    """Consulta en curso que comparten los pedidos simultáneos de una misma clave"""
+
+    def __init__(self):
+        self.listo = threading.Event()
+        self.valor = None
+        self.error = None
+
+
+class CacheLRU:
+    """Caché acotada por cantidad de entradas y por tiempo de vida.
+
+    Un valor `None` se guarda como resultado negativo con su propio tiempo
+    de vida, así las búsquedas de claves inexistentes tampoco llegan a la
+    base. Si varios hilos piden la misma clave ausente a la vez, sólo uno
+    ejecuta la carga y el resto espera su resultado.
+
+    No hay invalidación por clave: quien necesita ver las escrituras de
+    otros procesos incluye en la clave la versión de los datos, y las
+    entradas viejas dejan de pedirse y salen por LRU o vencimiento.
+    """
+
+    def __init__(self, capacidad=1024, ttl=300, ttl_negativo=30):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self._datos = OrderedDict()  # clave -> (valor, vencimiento)
+        self._en_curso = {}
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.aciertos_negativos = 0
+        self.fallos = 0
+        self.unificadas = 0
+        self.expulsiones = 0
+
+    def obtener(self, clave, cargar):
+        """Devolver el valor de la clave, usando `cargar()` si no está en caché"""
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None:
+                valor, vencimiento = entrada
+                if vencimiento > ahora:
+                    self._datos.move_to_end(clave)
+                    if valor is None:
+                        self.aciertos_negativos += 1
+                    else:
+                        self.aciertos += 1
+                    return valor
+                del self._datos[clave]
+
+            consulta = self._en_curso.get(clave)
+            if consulta is not None:
+                self.unificadas += 1
+                propia = False
+            else:
+                consulta = self._en_curso[clave] = _Consulta()
+                self.fallos += 1
+                propia = True
+
+        if not propia:
+            consulta.listo.wait()
+            if consulta.error is not None:
+                raise consulta.error
+            return consulta.valor
+
+        try:
+            consulta.valor = cargar()
+        except Exception as e:
+            consulta.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._en_curso[clave]
+                if consulta.error is None:
+                    self._guardar(clave, consulta.valor)
+            consulta.listo.set()
+        return consulta.valor
+
+    def _guardar(self, clave, valor):
+        ttl = self.ttl_negativo if valor is None else self.ttl
+        self._datos[clave] = (valor, time.monotonic() + ttl)
+        self._datos.move_to_end(clave)
+        while len(self._datos) > self.capacidad:
+            self._datos.popitem(last=False)
+            self.expulsiones += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.aciertos_negativos + self.fallos + self.unificadas
+            return {
+                'entradas': len(self._datos),
+                'capacidad': self.capacidad,
+                'aciertos': self.aciertos,
+                'aciertos_negativos': self.aciertos_negativos,
+                'fallos': self.fallos,
+                'unificadas': self.unificadas,
+                'expulsiones': self.expulsiones,
+                'tasa_aciertos': round((self.aciertos + self.aciertos_negativos) / consultas, 4) if consultas else 0.0,
+            }
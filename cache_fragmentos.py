@@ -0,0 +1,193 @@
+"""
+Caché de fragmentos HTML renderizados (las tablas de los listados)
+
+La clave incluye la versión de la tabla, que cada escritura incrementa en la
+misma transacción: al cambiar los datos las claves viejas dejan de pedirse y
+se descartan solas por LRU o vencimiento. Así la invalidación funciona igual
+con varios procesos, ya que la versión vive en la base.
+
+Backends:
+    memoria   caché LRU propia de cada proceso
+    archivos  un archivo por fragmento en un directorio compartido; cada tanto
+              se borran los vencidos, los de versiones viejas y los más
+              antiguos que exceden la capacidad
+    nulo      sin caché (siempre renderiza)
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+from urllib.parse import urlencode
+
+from cache import CacheLRU
+
+
+class BackendNulo:
+    """No guarda nada"""
+
+    def obtener(self, clave, generar):
+        return generar()
+
+    def limpiar(self):
+        pass
+
+    def estadisticas(self):
+        return {'backend': 'nulo'}
+
+
+class BackendMemoria:
+    """Fragmentos en una caché LRU del proceso"""
+
+    def __init__(self, capacidad=512, ttl=600):
+        self.cache = CacheLRU(capacidad, ttl)
+
+    def obtener(self, clave, generar):
+        return self.cache.obtener(clave, generar)
+
+    def limpiar(self):
+        self.cache.limpiar()
+
+    def estadisticas(self):
+        return {'backend': 'memoria', **self.cache.estadisticas()}
+
+
+def _huella(texto):
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()
+
+
+class BackendArchivos:
+    """Fragmentos en archivos, compartidos por todos los procesos que usan el directorio"""
+
+    def __init__(self, directorio, ttl=600, capacidad=512, intervalo=60):
+        self.directorio = directorio
+        self.ttl = ttl
+        self.capacidad = capacidad
+        self.intervalo = intervalo  # segundos mínimos entre purgas de cada proceso
+        self.aciertos = 0
+        self.fallos = 0
+        self.escrituras = 0  # desde la última purga
+        self.ultima_purga = time.monotonic()
+        os.makedirs(directorio, exist_ok=True)
+
+    def _ruta(self, clave):
+        # Las claves son ruta|versión|...: el nombre lleva la ruta y la versión para
+        # poder borrar las versiones viejas sin conocer la clave completa
+        ruta, version = (clave.split('|', 2) + ['', ''])[:2]
+        version = version if version.isdigit() else '0'
+        return os.path.join(self.directorio, f'{_huella(ruta)[:16]}-{version}-{_huella(clave)}.html')
+
+    def obtener(self, clave, generar):
+        ruta = self._ruta(clave)
+        try:
+            if time.time() - os.path.getmtime(ruta) < self.ttl:
+                with open(ruta, encoding='utf-8') as f:
+                    contenido = f.read()
+                self.aciertos += 1
+                return contenido
+        except OSError:
+            pass
+
+        self.fallos += 1
+        contenido = generar()
+        # Escritura atómica: otro proceso nunca lee un archivo a medio escribir
+        descriptor, temporal = tempfile.mkstemp(dir=self.directorio, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+                f.write(contenido)
+            os.replace(temporal, ruta)
+        except OSError:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+
+        self.escrituras += 1
+        if (time.monotonic() - self.ultima_purga >= self.intervalo
+                or self.escrituras >= max(1, self.capacidad // 4)):
+            self.purgar()
+        return contenido
+
+    def purgar(self):
+        """Borrar los fragmentos vencidos, los de versiones anteriores y los más viejos que exceden la capacidad"""
+        self.escrituras = 0
+        self.ultima_purga = time.monotonic()
+        vencimiento = time.time() - self.ttl
+        archivos, ultima_version = [], {}
+        for entrada in os.scandir(self.directorio):
+            try:
+                modificado = entrada.stat().st_mtime
+            except OSError:
+                continue
+            if entrada.name.endswith('.tmp'):
+                # Temporales abandonados por un proceso que terminó a mitad de la escritura
+                if modificado < vencimiento:
+                    self._borrar(entrada.path)
+                continue
+            partes = entrada.name[:-len('.html')].split('-')
+            if not entrada.name.endswith('.html') or len(partes) != 3 or not partes[1].isdigit():
+                continue
+            grupo, version = partes[0], int(partes[1])
+            ultima_version[grupo] = max(ultima_version.get(grupo, version), version)
+            archivos.append((modificado, entrada.path, grupo, version))
+
+        vigentes = []
+        for modificado, ruta, grupo, version in archivos:
+            if modificado < vencimiento or version < ultima_version[grupo]:
+                self._borrar(ruta)
+            else:
+                vigentes.append((modificado, ruta))
+        vigentes.sort()
+        for _, ruta in vigentes[:max(0, len(vigentes) - self.capacidad)]:
+            self._borrar(ruta)
+
+    @staticmethod
+    def _borrar(ruta):
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass  # otro proceso ya lo borró
+
+    def limpiar(self):
+        for nombre in os.listdir(self.directorio):
+            if nombre.endswith('.html'):
+                self._borrar(os.path.join(self.directorio, nombre))
+
+    def estadisticas(self):
+        entradas = sum(1 for nombre in os.listdir(self.directorio) if nombre.endswith('.html'))
+        return {'backend': 'archivos', 'directorio': self.directorio, 'entradas': entradas,
+                'capacidad': self.capacidad, 'aciertos': self.aciertos, 'fallos': self.fallos}
+
+
+BACKENDS = {
+    'nulo': BackendNulo,
+    'memoria': BackendMemoria,
+    'archivos': BackendArchivos,
+}
+
+
+class CacheFragmentos:
+    """Fragmentos identificados por ruta, parámetros y versión de la tabla"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or BackendNulo()
+
+    def configurar(self, tipo, **opciones):
+        if tipo not in BACKENDS:
+            raise ValueError(f'backend de caché de fragmentos desconocido: {tipo}')
+        self.backend = BACKENDS[tipo](**opciones)
+
+    @staticmethod
+    def clave(ruta, version, parametros, *extra):
+        """Clave estable para una ruta, su versión de datos y sus parámetros"""
+        # Codificados: ?cliente=a%26patente%3Db no debe coincidir con ?cliente=a&patente=b
+        argumentos = urlencode(sorted(parametros))
+        return '|'.join(str(parte) for parte in (ruta, version, argumentos, *extra))
+
+    def obtener(self, clave, generar):
+        """Fragmento guardado para la clave, o el que devuelve `generar()`"""
+        return self.backend.obtener(clave, generar)
+
+    def limpiar(self):
+        self.backend.limpiar()
+
+    def estadisticas(self):
+        return self.backend.estadisticas()
@@ -0,0 +1,148 @@
+"""
+Diario de altas y bajas para actualizar los listados en vivo
+
+Cada flush que inserta o elimina registros de una tabla registrada anota una
+fila por registro en la tabla `cambio`, dentro de la misma transacción; las
+operaciones masivas llaman a `anotar` explícitamente. El id autoincremental
+es el número de secuencia del evento, y `seguir` lo recorre por sondeo, de
+modo que funciona igual con varios procesos. Los eventos viejos se recortan
+desde las escrituras: cada `retener // 10` eventos anotados por el proceso se
+conservan sólo los últimos `retener`.
+
+Cada stream abierto ocupa un hilo del servidor mientras dura, así que
+`LimiteFlujos` acota cuántos puede haber a la vez por proceso; los pedidos
+que exceden el límite reciben sólo lo pendiente y se reconectan más tarde,
+con lo que el navegador pasa a consultar por sondeo.
+
+Un id más alto puede confirmarse antes que uno más bajo si dos transacciones
+se solapan. Por eso `seguir` no avanza sobre un hueco en la secuencia hasta
+que pasa `espera_hueco`: si era una transacción en curso, su evento aparece
+a tiempo; si fue revertida, el hueco se saltea.
+"""
+
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import event, func, select
+
+# Operaciones anotadas
+ALTA = 'insert'
+BAJA = 'delete'
+REINICIO = 'reinicio'  # la tabla se vació: los clientes deben recargar
+
+
+class Cambios:
+    """Anota y lee los eventos del diario de cambios"""
+
+    def __init__(self, db, modelo_cambio, retener=None):
+        self.db = db
+        self.tabla = modelo_cambio.__table__
+        self.tablas = set()
+        self.retener = retener
+        self.anotados = 0  # desde el último recorte
+        event.listen(db.session, 'after_flush', self._despues_de_flush)
+
+    def registrar(self, *modelos):
+        """Anotar las altas y bajas de los modelos indicados"""
+        self.tablas.update(modelo.__tablename__ for modelo in modelos)
+
+    def _despues_de_flush(self, session, contexto):
+        eventos = [
+            (objeto.__tablename__, operacion, objeto.id)
+            for objetos, operacion in ((session.new, ALTA), (session.deleted, BAJA))
+            for objeto in objetos
+            if getattr(objeto, '__tablename__', None) in self.tablas
+        ]
+        if eventos:
+            self._insertar(session.connection(), eventos)
+
+    def anotar(self, connection, tabla, operacion, ids=(None,)):
+        """Anotar eventos de una operación masiva que no pasa por el ORM"""
+        self._insertar(connection, [(tabla, operacion, id) for id in ids])
+
+    def _insertar(self, connection, eventos):
+        ahora = datetime.utcnow().replace(microsecond=0)
+        connection.execute(self.tabla.insert(), [
+            {'tabla': tabla, 'operacion': operacion, 'registro_id': id, 'fecha': ahora}
+            for tabla, operacion, id in eventos
+        ])
+        self.anotados += len(eventos)
+        if self.retener and self.anotados >= max(1, self.retener // 10):
+            self.anotados = 0
+            self._recortar(connection, self.retener)
+
+    def ultimo(self):
+        """Número de secuencia del último evento anotado (0 si no hay)"""
+        return self.db.session.execute(select(func.max(self.tabla.c.id))).scalar() or 0
+
+    def recortar(self, retener):
+        """Descartar los eventos más viejos, conservando los últimos `retener`"""
+        with self.db.engine.begin() as connection:
+            return self._recortar(connection, retener)
+
+    def _recortar(self, connection, retener):
+        ultimo = connection.execute(select(func.max(self.tabla.c.id))).scalar() or 0
+        return connection.execute(self.tabla.delete().where(self.tabla.c.id <= ultimo - retener)).rowcount
+
+    def _limites(self, connection):
+        return connection.execute(select(func.min(self.tabla.c.id), func.max(self.tabla.c.id))).one()
+
+    def seguir(self, ultimo, intervalo=1.0, duracion=300, espera_hueco=5.0, lote=500):
+        """Generador de (último id, eventos nuevos) por cada sondeo, durante `duracion` segundos.
+
+        Siempre hace al menos un sondeo (con `duracion=0`, uno solo). Si
+        `ultimo` ya no está en el diario (recortado o de otra base) emite un
+        único evento REINICIO y termina.
+        """
+        fin = time.monotonic() + duracion
+        hueco = None  # (id esperado, momento en que se detectó el hueco)
+        with self.db.engine.connect() as connection:
+            primero, maximo = self._limites(connection)
+        if ultimo > (maximo or 0) or (primero is not None and ultimo < primero - 1):
+            yield maximo or 0, [{'id': maximo or 0, 'tabla': None, 'operacion': REINICIO, 'registro_id': None}]
+            return
+
+        while True:
+            with self.db.engine.connect() as connection:
+                filas = connection.execute(
+                    select(self.tabla.c.id, self.tabla.c.tabla, self.tabla.c.operacion, self.tabla.c.registro_id)
+                    .where(self.tabla.c.id > ultimo)
+                    .order_by(self.tabla.c.id)
+                    .limit(lote)
+                ).all()
+            eventos = []
+            for fila in filas:
+                if fila.id != ultimo + 1:
+                    if hueco is None or hueco[0] != ultimo + 1:
+                        hueco = (ultimo + 1, time.monotonic())
+                    if time.monotonic() - hueco[1] < espera_hueco:
+                        break
+                eventos.append(fila._asdict())
+                ultimo = fila.id
+            yield ultimo, eventos
+            if time.monotonic() >= fin:
+                break
+            if len(eventos) < lote:
+                time.sleep(intervalo)
+
+
+class LimiteFlujos:
+    """Cantidad máxima de streams abiertos a la vez en este proceso"""
+
+    def __init__(self, maximo=4):
+        self.maximo = maximo
+        self.activos = 0
+        self._lock = threading.Lock()
+
+    def tomar(self):
+        """Ocupar un lugar si hay; devuelve si se pudo"""
+        with self._lock:
+            if self.activos >= self.maximo:
+                return False
+            self.activos += 1
+            return True
+
+    def liberar(self):
+        with self._lock:
+            self.activos -= 1
@@ -1,44 +1,131 @@
 import os
 
+def activado(variable, por_defecto=False):
+    """Variable de entorno booleana (1, true, si, on)"""
+    valor = os.environ.get(variable)
+    if valor is None:
+        return por_defecto
+    return valor.strip().lower() in ('1', 'true', 'si', 'sí', 'on')
+
 class Config:
     """Configuración base de la aplicación"""
-    SECRET_KEY = 'mi_super_secreto_12345'
+    SECRET_KEY = os.environ.get('SECRET_KEY') or 'mi_super_secreto_12345'
     
     # Configuración de base de datos - MySQL sin contraseña
-    SQLALCHEMY_DATABASE_URI = 'mysql+pymysql://root@localhost/gestoria'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'mysql+pymysql://root@localhost/gestoria'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Pool de conexiones: pool_recycle debe ser menor que el wait_timeout de
+    # MySQL y pool_pre_ping descarta conexiones cortadas ("MySQL server has gone away")
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 280)),
+        'pool_pre_ping': True,
+        'connect_args': {
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 10)),
+            'read_timeout': int(os.environ.get('DB_READ_TIMEOUT', 30)),
+            'write_timeout': int(os.environ.get('DB_WRITE_TIMEOUT', 30)),
+        },
+    }
+    
+    # Servidor de producción (python run.py --produccion)
+    SERVIDOR_HOST = os.environ.get('SERVIDOR_HOST', '0.0.0.0')
+    SERVIDOR_PUERTO = int(os.environ.get('SERVIDOR_PUERTO', 5000))
+    SERVIDOR_HILOS = int(os.environ.get('SERVIDOR_HILOS', 16))
+    
     # Configuración de la aplicación
     APP_NAME = 'Documentación Vehicular'
     APP_VERSION = '1.0.0'
     
     # Configuración de paginación
     ITEMS_PER_PAGE = 20
+    LISTADO_COMPLETO_LOTE = 500  # filas leídas y enviadas por bloque con ?todo=1
+    API_LIMITE = 100  # registros por página de /api/datos/<tabla>
+    API_LIMITE_MAXIMO = 1000
+    
+    # Configuración de la caché de búsqueda por patente
+    CACHE_PATENTES_CAPACIDAD = 4096
+    CACHE_PATENTES_TTL = 300  # segundos
+    CACHE_PATENTES_TTL_NEGATIVO = 30  # segundos para patentes inexistentes
+    
+    # Autocompletado: con escrituras de otros procesos, segundos mínimos entre
+    # recargas completas del índice (mientras tanto puede faltar lo más reciente)
+    INDICE_PREFIJOS_RECARGA = 10
+    
+    # Caché de las tablas renderizadas de los listados: memoria, archivos o nulo
+    # (archivos permite compartirla entre varios procesos del servidor)
+    CACHE_FRAGMENTOS = os.environ.get('CACHE_FRAGMENTOS', 'memoria')
+    CACHE_FRAGMENTOS_DIR = os.environ.get('CACHE_FRAGMENTOS_DIR')  # por defecto instance/fragmentos
+    CACHE_FRAGMENTOS_CAPACIDAD = 512
+    CACHE_FRAGMENTOS_TTL = 600  # segundos
+    
+    # Tablero
+    DASHBOARD_DIAS = 30  # días de altas que muestra el tablero
+    DIAS_VENCIMIENTO_RETIRO = 7  # días tras la presentación para considerar vencido un retiro
+    
+    # Reinicio y purga de datos
+    PERMITIR_REINICIO_DATOS = False  # /datos/limpiar y 'flask reiniciar-datos' fuera de DEBUG
+    PURGA_LOTE = 500  # registros por transacción en 'flask purgar-antiguos'
+    PURGA_PAUSA = 0.2  # segundos entre lotes
+    
+    # Instrumentación: cabecera Server-Timing y registro de consultas lentas (JSON por línea)
+    SERVER_TIMING = True
+    UMBRAL_CONSULTA_LENTA_MS = int(os.environ.get('UMBRAL_CONSULTA_LENTA_MS', 100))
+    REGISTRO_CONSULTAS_LENTAS = os.environ.get('REGISTRO_CONSULTAS_LENTAS')  # por defecto stderr
+    
+    # Métricas de /metrics: con varios procesos, directorio compartido donde cada uno vuelca las suyas
+    METRICAS_DIR = os.environ.get('METRICAS_DIR')
+    METRICAS_INTERVALO = int(os.environ.get('METRICAS_INTERVALO', 5))  # segundos entre volcados
+    
+    # Actualización en vivo de los listados (/eventos)
+    CAMBIOS_INTERVALO = 1.0  # segundos entre consultas al diario de cambios
+    # Cada stream abierto ocupa un hilo: conexiones cortas y pocas a la vez por proceso, dejando
+    # SERVIDOR_HILOS - CAMBIOS_MAX_FLUJOS hilos para el resto de los pedidos
+    CAMBIOS_DURACION = 25  # segundos que dura cada conexión; el navegador se reconecta solo
+    CAMBIOS_MAX_FLUJOS = int(os.environ.get('CAMBIOS_MAX_FLUJOS', 4))  # streams abiertos a la vez por proceso
+    CAMBIOS_SONDEO_MS = 10000  # reintento de los pedidos que exceden el límite (sondeo)
+    CAMBIOS_ESPERA_HUECO = 5.0  # segundos que se espera un evento faltante antes de saltearlo
+    CAMBIOS_LATIDO = 15  # segundos sin eventos antes de enviar un comentario de latido
+    CAMBIOS_REINTENTO_MS = 3000
+    CAMBIOS_RETENER = 10000  # eventos que se conservan en el diario (se recorta al escribir)
+    
+    # Exportación (/datos/exportar): segundos que se espera a las transacciones en
+    # curso cuando hay huecos de ids antes del corte, para que el próximo since no las saltee
+    EXPORTACION_ESPERA_HUECO = 2.0
+    
+    # Búsqueda de texto completo (/buscar)
+    BUSQUEDA_POR_PAGINA = 20
     
     # Configuración de archivos
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     UPLOAD_FOLDER = 'uploads'
     
     # Configuración de seguridad
-    SESSION_COOKIE_SECURE = False  # Cambiar a True en producción con HTTPS
+    # Sólo con HTTPS (directo o detrás de un proxy con TLS): con HTTP plano el
+    # navegador no devolvería la cookie y se perderían la sesión y los mensajes
+    SESSION_COOKIE_SECURE = activado('SESSION_COOKIE_SECURE')
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
 
 class DevelopmentConfig(Config):
     """Configuración para desarrollo"""
     DEBUG = True
-    SQLALCHEMY_ECHO = True
+    SQLALCHEMY_ECHO = activado('SQLALCHEMY_ECHO')  # registrar cada sentencia SQL
 
 class ProductionConfig(Config):
     """Configuración para producción"""
     DEBUG = False
     SQLALCHEMY_ECHO = False
-    SESSION_COOKIE_SECURE = True
+    SECRET_KEY = os.environ.get('SECRET_KEY')  # obligatoria: sin valor por defecto
 
 class TestingConfig(Config):
     """Configuración para testing"""
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    PERMITIR_REINICIO_DATOS = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') or 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
     WTF_CSRF_ENABLED = False
 
 # Diccionario de configuraciones
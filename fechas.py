@@ -0,0 +1,14 @@
+"""
+Fecha y hora en la zona horaria de Argentina, la de los usuarios del sistema
+"""
+
+from datetime import datetime
+
+import pytz
+
+ARGENTINA_TZ = pytz.timezone('America/Argentina/Buenos_Aires')
+
+
+def hoy():
+    """Fecha actual en Argentina"""
+    return datetime.now(ARGENTINA_TZ).date()
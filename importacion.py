@@ -0,0 +1,149 @@
+"""
+Importación masiva de vehículos desde CSV con inserciones por lotes
+
+El archivo se lee como stream y se procesa en lotes: cada lote se valida,
+se normaliza y se escribe con un único INSERT de varias filas que actualiza
+las patentes existentes (ON DUPLICATE KEY UPDATE en MySQL, ON CONFLICT en
+SQLite), dentro de su propia transacción. Dos patentes son la misma si
+coinciden normalizadas (`AB 123 CD` y `AB123CD`).
+"""
+
+import csv
+import time
+from datetime import datetime
+
+from sqlalchemy import select
+
+from cambios import ALTA
+from fechas import ARGENTINA_TZ
+from patentes import validar_patente
+
+COLUMNAS = ('cliente', 'modelo', 'lugar_compra', 'color', 'patente')
+
+
+def upsert(connection, tabla, filas, clave, actualizar=(), sumar=()):
+    """INSERT de varias filas que, si la clave ya existe, reemplaza las columnas de `actualizar`
+    y suma a las de `sumar` el valor nuevo; `clave` es una columna o una tupla de columnas"""
+    if connection.dialect.name == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        sentencia = insert(tabla).values(filas)
+        nuevo = sentencia.inserted
+        conflicto = sentencia.on_duplicate_key_update
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+        sentencia = insert(tabla).values(filas)
+        nuevo = sentencia.excluded
+        claves = [clave] if isinstance(clave, str) else list(clave)
+        conflicto = lambda valores: sentencia.on_conflict_do_update(index_elements=claves, set_=valores)
+    valores = {c: nuevo[c] for c in actualizar}
+    valores.update({c: tabla.c[c] + nuevo[c] for c in sumar})
+    connection.execute(conflicto(valores))
+
+
+class ResultadoImportacion:
+    """Resumen de una importación: filas escritas, rechazos y velocidad"""
+
+    def __init__(self):
+        self.insertados = 0
+        self.actualizados = 0
+        self.rechazos = []  # (número de línea, motivo)
+        self.segundos = 0.0
+
+    @property
+    def procesados(self):
+        return self.insertados + self.actualizados + len(self.rechazos)
+
+    @property
+    def filas_por_segundo(self):
+        return self.procesados / self.segundos if self.segundos else 0.0
+
+    def resumen(self):
+        return (f'{self.insertados} insertados, {self.actualizados} actualizados, '
+                f'{len(self.rechazos)} rechazados ({self.filas_por_segundo:.0f} filas/s)')
+
+
+class ImportadorVehiculos:
+    """Valida e inserta vehículos por lotes manteniendo los índices auxiliares"""
+
+    def __init__(self, db, modelo, indice_busqueda, versiones, resumen=None, cambios=None, lote=500):
+        self.db = db
+        self.modelo = modelo
+        self.tabla = modelo.__table__
+        self.indice_busqueda = indice_busqueda
+        self.versiones = versiones
+        self.resumen = resumen
+        self.cambios = cambios
+        self.lote = lote
+
+    def validar(self, fila):
+        """Normalizar una fila del CSV o lanzar ValueError con el motivo del rechazo"""
+        datos = {}
+        for columna in COLUMNAS:
+            valor = fila.get(columna)
+            if valor is not None and not isinstance(valor, str):
+                raise ValueError(f'{columna} debe ser texto')
+            valor = (valor or '').strip()
+            if not valor:
+                raise ValueError(f'falta {columna}')
+            largo = self.tabla.c[columna].type.length
+            if len(valor) > largo:
+                raise ValueError(f'{columna} supera los {largo} caracteres')
+            datos[columna] = valor
+        datos['patente'] = datos['patente'].upper()
+        datos['patente_norm'] = validar_patente(datos['patente'])
+        return datos
+
+    def importar(self, archivo):
+        """Importar un archivo de texto CSV con encabezado"""
+        resultado = ResultadoImportacion()
+        inicio = time.perf_counter()
+        lector = csv.DictReader(archivo)
+        faltantes = set(COLUMNAS) - set(lector.fieldnames or ())
+        if faltantes:
+            raise ValueError(f'faltan columnas en el encabezado: {", ".join(sorted(faltantes))}')
+
+        pendientes = {}
+        for fila in lector:
+            try:
+                datos = self.validar(fila)
+            except ValueError as e:
+                resultado.rechazos.append((lector.line_num, str(e)))
+                continue
+            # Dentro del lote gana la última aparición de cada patente
+            pendientes[datos['patente_norm']] = datos
+            if len(pendientes) >= self.lote:
+                self._escribir(list(pendientes.values()), resultado)
+                pendientes = {}
+        if pendientes:
+            self._escribir(list(pendientes.values()), resultado)
+
+        resultado.segundos = time.perf_counter() - inicio
+        return resultado
+
+    def _escribir(self, filas, resultado):
+        claves = [fila['patente_norm'] for fila in filas]
+        ahora = datetime.now(ARGENTINA_TZ)
+        with self.db.engine.begin() as connection:
+            existentes = set(connection.execute(
+                select(self.tabla.c.patente_norm).where(self.tabla.c.patente_norm.in_(claves))
+            ).scalars())
+            upsert(connection, self.tabla,
+                   [{**fila, 'fecha_creacion': ahora} for fila in filas],
+                   clave='patente_norm', actualizar=('cliente', 'modelo', 'lugar_compra', 'color'))
+
+            # Reindexar la búsqueda por trigramas de las filas escritas
+            escritas = connection.execute(
+                select(self.tabla.c.id, self.tabla.c.cliente, self.tabla.c.patente_norm)
+                .where(self.tabla.c.patente_norm.in_(claves))
+            ).all()
+            self.indice_busqueda.desindexar(connection, self.modelo, [fila.id for fila in escritas])
+            self.indice_busqueda.indexar(connection, self.modelo, escritas)
+            self.versiones.incrementar(connection, [self.tabla.name])
+            if self.resumen and len(filas) > len(existentes):
+                self.resumen.ajustar(connection, {(self.tabla.name, ahora.date()): len(filas) - len(existentes)})
+            if self.cambios and len(filas) > len(existentes):
+                nuevas = [fila.id for fila in escritas if fila.patente_norm not in existentes]
+                self.cambios.anotar(connection, self.tabla.name, ALTA, nuevas)
+
+        resultado.actualizados += len(existentes)
+        resultado.insertados += len(filas) - len(existentes)
@@ -0,0 +1,137 @@
+"""
+Tiempos de consultas SQL, renderizado y pedido completo
+
+Los eventos del motor cuentan las consultas del pedido y suman su duración;
+las señales de plantillas miden el renderizado. Al terminar el pedido los
+totales se envían en la cabecera Server-Timing, que el navegador muestra en
+la pestaña de red. Las consultas que superan el umbral se escriben como una
+línea JSON en el registro 'consultas_lentas', con la ruta y la huella de la
+sentencia (literales reemplazados por ?), así las variantes de una misma
+consulta se agrupan. En los listados en streaming (?todo=1) la cabecera se
+envía antes de renderizar las filas y sólo cubre la primera parte.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import time
+from datetime import datetime
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+registro_lentas = logging.getLogger('consultas_lentas')
+
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAMETROS = re.compile(r'%\(\w+\)s|%s|(?<!:):\w+')
+_LISTAS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_ESPACIOS = re.compile(r'\s+')
+
+
+def normalizar(sentencia):
+    """Sentencia sin literales, con listas IN colapsadas y espacios simples"""
+    texto = _LITERALES.sub('?', sentencia)
+    texto = _PARAMETROS.sub('?', texto)  # estilos de pymysql (%s) y con nombre (:x)
+    texto = _LISTAS.sub('(?)', texto)
+    return _ESPACIOS.sub(' ', texto).strip()
+
+
+def _huella(normalizada):
+    return hashlib.sha1(normalizada.encode('utf-8')).hexdigest()[:16]
+
+
+def huella(sentencia):
+    """Identificador corto de la forma de una sentencia"""
+    return _huella(normalizar(sentencia))
+
+
+class Instrumentacion:
+    """Mide cada pedido y registra las consultas lentas"""
+
+    def __init__(self):
+        self.umbral = 0.1  # segundos
+        self.server_timing = True
+        self.observadores = []  # funciones (sentencia, segundos) llamadas tras cada consulta
+        event.listen(Engine, 'before_cursor_execute', self._antes_de_consulta)
+        event.listen(Engine, 'after_cursor_execute', self._despues_de_consulta)
+
+    def init_app(self, app):
+        self.umbral = app.config['UMBRAL_CONSULTA_LENTA_MS'] / 1000
+        self.server_timing = app.config['SERVER_TIMING']
+        archivo = app.config['REGISTRO_CONSULTAS_LENTAS']
+        if archivo and not any(getattr(h, 'baseFilename', None) == archivo for h in registro_lentas.handlers):
+            registro_lentas.addHandler(logging.FileHandler(archivo, encoding='utf-8'))
+        elif not archivo and not registro_lentas.handlers:
+            registro_lentas.addHandler(logging.StreamHandler())  # stderr
+        registro_lentas.setLevel(logging.WARNING)
+        app.before_request(self._iniciar)
+        app.after_request(self._finalizar)
+        before_render_template.connect(self._antes_de_renderizar, app)
+        template_rendered.connect(self._despues_de_renderizar, app)
+
+    # Pedido
+
+    def _iniciar(self):
+        g.medicion = {'inicio': time.perf_counter(), 'consultas': 0, 'db': 0.0, 'render': 0.0,
+                      'renderizando': 0, 'inicio_render': 0.0}
+
+    def _finalizar(self, response):
+        medicion = g.pop('medicion', None)
+        if medicion and self.server_timing:
+            total = time.perf_counter() - medicion['inicio']
+            response.headers['Server-Timing'] = ', '.join((
+                f'db;dur={medicion["db"] * 1000:.1f};desc="{medicion["consultas"]} consultas"',
+                f'render;dur={medicion["render"] * 1000:.1f}',
+                f'total;dur={total * 1000:.1f}',
+            ))
+        return response
+
+    def medicion(self):
+        """Totales del pedido en curso, o None fuera de un pedido"""
+        return g.get('medicion') if has_request_context() else None
+
+    # Plantillas (sólo la más externa si una plantilla renderiza otra)
+
+    def _antes_de_renderizar(self, sender, **extra):
+        medicion = self.medicion()
+        if medicion is not None:
+            if not medicion['renderizando']:
+                medicion['inicio_render'] = time.perf_counter()
+            medicion['renderizando'] += 1
+
+    def _despues_de_renderizar(self, sender, **extra):
+        medicion = self.medicion()
+        if medicion is not None and medicion['renderizando']:
+            medicion['renderizando'] -= 1
+            if not medicion['renderizando']:
+                medicion['render'] += time.perf_counter() - medicion['inicio_render']
+
+    # Consultas
+
+    def _antes_de_consulta(self, conn, cursor, sentencia, parametros, contexto, executemany):
+        conn.info.setdefault('inicio_consulta', []).append(time.perf_counter())
+
+    def _despues_de_consulta(self, conn, cursor, sentencia, parametros, contexto, executemany):
+        segundos = time.perf_counter() - conn.info['inicio_consulta'].pop()
+        medicion = self.medicion()
+        if medicion is not None:
+            medicion['consultas'] += 1
+            medicion['db'] += segundos
+        for observador in self.observadores:
+            observador(sentencia, segundos)
+        if segundos >= self.umbral:
+            self._registrar_lenta(sentencia, segundos)
+
+    def _registrar_lenta(self, sentencia, segundos):
+        normalizada = normalizar(sentencia)
+        datos = {
+            'fecha': datetime.now().isoformat(timespec='milliseconds'),
+            'duracion_ms': round(segundos * 1000, 1),
+            'huella': _huella(normalizada),
+            'ruta': request.endpoint if has_request_context() else None,
+            'metodo': request.method if has_request_context() else None,
+            'sentencia': normalizada[:2000],
+        }
+        registro_lentas.warning(json.dumps(datos, ensure_ascii=False))
@@ -0,0 +1,91 @@
+"""
+Eliminación por lotes de los registros seleccionados en los listados
+
+Cada lote se borra con un único `DELETE ... WHERE id IN (...)` en su propia
+transacción, junto con sus entradas del índice de búsqueda, los contadores
+del tablero, la versión de la tabla y el diario de cambios, que no se
+actualizan solos porque el borrado no pasa por el ORM.
+"""
+
+from collections import Counter
+
+from sqlalchemy import Date, func, select
+
+from cambios import BAJA
+
+ID_MAXIMO = 2 ** 31 - 1  # máximo de una columna INT de MySQL
+
+
+def _ids_validos(ids):
+    validos = set()
+    for valor in ids:
+        try:
+            id = int(valor)
+        except (TypeError, ValueError):
+            raise ValueError(f'id inválido: {valor}')
+        # Fuera del rango de la columna el driver falla en lugar de no encontrar nada
+        if not 1 <= id <= ID_MAXIMO:
+            raise ValueError(f'id fuera de rango: {valor}')
+        validos.add(id)
+    return sorted(validos)
+
+
+class EliminadorLotes:
+    """Borra registros por id en lotes manteniendo los índices auxiliares"""
+
+    def __init__(self, db, indice_busqueda, versiones, resumen, cambios=None, lote=500):
+        self.db = db
+        self.indice_busqueda = indice_busqueda
+        self.versiones = versiones
+        self.resumen = resumen
+        self.cambios = cambios
+        self.lote = lote
+
+    def eliminar(self, modelo, ids):
+        """Eliminar los registros con los ids indicados y devolver cuántos se borraron"""
+        ids = _ids_validos(ids)
+        eliminados = 0
+        for inicio in range(0, len(ids), self.lote):
+            eliminados += self._eliminar_lote(modelo, ids[inicio:inicio + self.lote])
+        return eliminados
+
+    def _eliminar_lote(self, modelo, ids):
+        tabla = modelo.__table__
+        with self.db.engine.begin() as connection:
+            # Claves del resumen de las filas que se van a borrar (bloqueadas hasta el DELETE)
+            dia = func.date(tabla.c.fecha_creacion, type_=Date)
+            diario = Counter({
+                (tabla.name, fila[0]): -fila[1]
+                for fila in connection.execute(
+                    select(dia, func.count())
+                    .where(tabla.c.id.in_(ids), tabla.c.fecha_creacion.isnot(None))
+                    .group_by(dia)
+                    .with_for_update()
+                )
+            })
+            retiro = Counter()
+            if modelo is self.resumen.modelo_lugar_retiro:
+                retiro.update({
+                    (fila[0], fila[1]): -fila[2]
+                    for fila in connection.execute(
+                        select(tabla.c.lugar_registro, tabla.c.fecha_presentacion, func.count())
+                        .where(tabla.c.id.in_(ids))
+                        .group_by(tabla.c.lugar_registro, tabla.c.fecha_presentacion)
+                        .with_for_update()
+                    )
+                })
+
+            if self.cambios:
+                # Sólo los ids que existen generan un evento de baja
+                ids = connection.execute(select(tabla.c.id).where(tabla.c.id.in_(ids)).with_for_update()).scalars().all()
+
+            eliminados = connection.execute(tabla.delete().where(tabla.c.id.in_(ids))).rowcount if ids else 0
+            if eliminados:
+                self.indice_busqueda.desindexar(connection, modelo, ids)
+                # Mismo orden de bloqueo que los flush del ORM y la importación:
+                # primero version_tabla y después los contadores del resumen
+                self.versiones.incrementar(connection, [tabla.name])
+                self.resumen.ajustar(connection, diario, retiro)
+                if self.cambios:
+                    self.cambios.anotar(connection, tabla.name, BAJA, ids)
+        return eliminados
@@ -0,0 +1,265 @@
+"""
+Métricas de la aplicación en formato de texto de Prometheus (/metrics)
+
+Cada hilo acumula sus contadores e histogramas en su propio diccionario, así
+el registro en el camino de cada pedido no toma ningún lock; al exponer se
+suman los diccionarios de todos los hilos. Con varios procesos (gunicorn) y
+METRICAS_DIR configurado, cada proceso vuelca su estado a un archivo JSON en
+ese directorio cada METRICAS_INTERVALO segundos, y /metrics suma los archivos
+de todos los procesos. Los archivos de procesos terminados se conservan para
+que los contadores no retrocedan; los indicadores (pool de conexiones) sólo
+se informan para procesos que actualizaron su archivo recientemente.
+"""
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, has_request_context, request
+
+PREFIJO = 'gestoria_'
+
+BUCKETS_PEDIDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# nombre: (tipo, ayuda, etiquetas, buckets)
+DEFINICIONES = {
+    'pedido_duracion_segundos': ('histogram', 'Duración de los pedidos por endpoint',
+                                 ('endpoint', 'metodo'), BUCKETS_PEDIDOS),
+    'pedidos_total': ('counter', 'Pedidos atendidos por endpoint y estado HTTP',
+                      ('endpoint', 'metodo', 'estado'), None),
+    'consulta_duracion_segundos': ('histogram', 'Duración de las consultas SQL por tipo de sentencia',
+                                   ('operacion',), BUCKETS_CONSULTAS),
+    'errores_total': ('counter', 'Errores capturados por endpoint y tipo de excepción',
+                      ('endpoint', 'tipo'), None),
+    'pool_conexiones': ('gauge', 'Conexiones del pool de SQLAlchemy por estado',
+                        ('estado', 'pid'), None),
+}
+
+OPERACIONES = ('SELECT', 'INSERT', 'UPDATE', 'DELETE')
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(nombres, valores, extra=''):
+    pares = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Metricas:
+    """Contadores e histogramas por hilo, agregados al exponer"""
+
+    def __init__(self):
+        self.directorio = None
+        self.intervalo = 5
+        self.estado_pool = None  # función que devuelve {estado: conexiones}
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self._almacenes = []
+        self._lock = threading.Lock()  # sólo al crear el almacén de un hilo nuevo
+        self._volcador = None
+        if hasattr(os, 'register_at_fork'):
+            # Proceso hijo (gunicorn): no heredar lo contado por el padre
+            os.register_at_fork(after_in_child=self._reiniciar_proceso)
+
+    def init_app(self, app, estado_pool=None):
+        self.directorio = app.config['METRICAS_DIR']
+        self.intervalo = app.config['METRICAS_INTERVALO']
+        self.estado_pool = estado_pool
+        if self.directorio:
+            os.makedirs(self.directorio, exist_ok=True)
+        app.before_request(self._iniciar)
+        app.after_request(self._finalizar)
+
+    # Registro (camino de cada pedido)
+
+    def _almacen(self):
+        almacen = getattr(self._local, 'almacen', None)
+        if almacen is None:
+            almacen = self._local.almacen = {'contadores': {}, 'histogramas': {}}
+            with self._lock:
+                self._almacenes.append(almacen)
+        return almacen
+
+    def _reiniciar_proceso(self):
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self._almacenes = []
+        self._lock = threading.Lock()
+        self._volcador = None
+
+    def incrementar(self, nombre, etiquetas, cantidad=1):
+        contadores = self._almacen()['contadores']
+        clave = (nombre, etiquetas)
+        contadores[clave] = contadores.get(clave, 0) + cantidad
+
+    def observar(self, nombre, etiquetas, valor):
+        histogramas = self._almacen()['histogramas']
+        clave = (nombre, etiquetas)
+        histograma = histogramas.get(clave)
+        if histograma is None:
+            buckets = DEFINICIONES[nombre][3]
+            # Un casillero por bucket y +Inf, luego la suma y la cantidad
+            histograma = histogramas[clave] = [0] * (len(buckets) + 1) + [0.0, 0]
+        histograma[bisect_left(DEFINICIONES[nombre][3], valor)] += 1
+        histograma[-2] += valor
+        histograma[-1] += 1
+
+    def error(self, excepcion, endpoint=None):
+        """Contar una excepción capturada en una ruta"""
+        if endpoint is None and has_request_context():
+            endpoint = request.endpoint
+        self.incrementar('errores_total', (self._endpoint(endpoint), type(excepcion).__name__))
+
+    def consulta(self, sentencia, segundos):
+        """Registrar la duración de una consulta SQL"""
+        operacion = sentencia.lstrip()[:6].upper()
+        self.observar('consulta_duracion_segundos', (operacion if operacion in OPERACIONES else 'OTRA',), segundos)
+
+    @staticmethod
+    def _endpoint(endpoint):
+        return endpoint.rpartition('.')[2] if endpoint else 'sin_ruta'
+
+    def _iniciar(self):
+        g.inicio_metricas = time.perf_counter()
+        if self.directorio and self._volcador is None:
+            self._iniciar_volcador()
+
+    def _finalizar(self, response):
+        inicio = g.pop('inicio_metricas', None)
+        if inicio is not None:
+            endpoint = self._endpoint(request.endpoint)
+            self.observar('pedido_duracion_segundos', (endpoint, request.method), time.perf_counter() - inicio)
+            self.incrementar('pedidos_total', (endpoint, request.method, str(response.status_code)))
+        return response
+
+    # Agregación
+
+    def instantanea(self):
+        """Estado sumado de todos los hilos de este proceso"""
+        contadores, histogramas = {}, {}
+        for almacen in list(self._almacenes):
+            for clave, valor in dict(almacen['contadores']).items():
+                contadores[clave] = contadores.get(clave, 0) + valor
+            for clave, valores in dict(almacen['histogramas']).items():
+                acumulado = histogramas.setdefault(clave, [0] * len(valores))
+                for i, valor in enumerate(list(valores)):
+                    acumulado[i] += valor
+        indicadores = {}
+        if self.estado_pool:
+            try:
+                for estado, valor in self.estado_pool().items():
+                    indicadores[('pool_conexiones', (estado, str(self._pid)))] = valor
+            except Exception:
+                pass  # sin base disponible: se omiten los indicadores
+        return {'contadores': contadores, 'histogramas': histogramas, 'indicadores': indicadores}
+
+    def _archivo(self, pid):
+        return os.path.join(self.directorio, f'metricas_{pid}.json')
+
+    def volcar(self):
+        """Escribir la instantánea de este proceso en METRICAS_DIR"""
+        if not self.directorio:
+            return
+        estado = self.instantanea()
+        datos = {
+            'pid': self._pid,
+            'fecha': time.time(),
+            **{tipo: [[nombre, list(etiquetas), valor] for (nombre, etiquetas), valor in valores.items()]
+               for tipo, valores in estado.items()},
+        }
+        descriptor, temporal = tempfile.mkstemp(dir=self.directorio, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+                json.dump(datos, f)
+            os.replace(temporal, self._archivo(self._pid))
+        except OSError:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+
+    def _iniciar_volcador(self):
+        def volcar_periodicamente():
+            while True:
+                time.sleep(self.intervalo)
+                self.volcar()
+
+        with self._lock:
+            if self._volcador is None:
+                self._volcador = threading.Thread(target=volcar_periodicamente, name='metricas', daemon=True)
+                self._volcador.start()
+                atexit.register(self.volcar)
+
+    def _procesos(self):
+        """Instantáneas de todos los procesos que escriben en METRICAS_DIR"""
+        self.volcar()
+        estados = []
+        vigencia = time.time() - 3 * self.intervalo
+        for nombre in os.listdir(self.directorio):
+            if not (nombre.startswith('metricas_') and nombre.endswith('.json')):
+                continue
+            try:
+                with open(os.path.join(self.directorio, nombre), encoding='utf-8') as f:
+                    datos = json.load(f)
+            except (OSError, ValueError):
+                continue
+            estado = {tipo: {(n, tuple(e)): v for n, e, v in datos.get(tipo, [])}
+                      for tipo in ('contadores', 'histogramas', 'indicadores')}
+            if datos['fecha'] < vigencia and datos['pid'] != self._pid:
+                estado['indicadores'] = {}
+            estados.append(estado)
+        return estados
+
+    def agregado(self):
+        """Estado sumado de todos los procesos (o sólo de este sin METRICAS_DIR)"""
+        if not self.directorio:
+            return self.instantanea()
+        total = {'contadores': {}, 'histogramas': {}, 'indicadores': {}}
+        for estado in self._procesos():
+            for clave, valor in estado['contadores'].items():
+                total['contadores'][clave] = total['contadores'].get(clave, 0) + valor
+            for clave, valores in estado['histogramas'].items():
+                acumulado = total['histogramas'].setdefault(clave, [0] * len(valores))
+                for i, valor in enumerate(valores):
+                    acumulado[i] += valor
+            total['indicadores'].update(estado['indicadores'])
+        return total
+
+    # Exposición
+
+    def exponer(self):
+        """Texto en el formato de exposición de Prometheus"""
+        estado = self.agregado()
+        valores = {**estado['contadores'], **estado['indicadores']}
+        lineas = []
+        for nombre, (tipo, ayuda, etiquetas, buckets) in DEFINICIONES.items():
+            completo = PREFIJO + nombre
+            lineas.append(f'# HELP {completo} {ayuda}')
+            lineas.append(f'# TYPE {completo} {tipo}')
+            if tipo == 'histogram':
+                for (n, valores_etiquetas), histograma in sorted(estado['histogramas'].items()):
+                    if n != nombre:
+                        continue
+                    acumulado = 0
+                    for limite, cantidad in zip((*buckets, '+Inf'), histograma):
+                        acumulado += cantidad
+                        le = f'le="{limite}"'
+                        lineas.append(f'{completo}_bucket{_etiquetas(etiquetas, valores_etiquetas, le)} {acumulado}')
+                    lineas.append(f'{completo}_sum{_etiquetas(etiquetas, valores_etiquetas)} {_numero(histograma[-2])}')
+                    lineas.append(f'{completo}_count{_etiquetas(etiquetas, valores_etiquetas)} {histograma[-1]}')
+            else:
+                for (n, valores_etiquetas), valor in sorted(valores.items()):
+                    if n == nombre:
+                        lineas.append(f'{completo}{_etiquetas(etiquetas, valores_etiquetas)} {_numero(valor)}')
+        return '\n'.join(lineas) + '\n'
@@ -0,0 +1,108 @@
+"""patente normalizada
+
+Revision ID: 0a7d3c9e5b18
+Revises: f6b2d8e41a93
+Create Date: 2025-10-17 09:26:44.170952
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a7d3c9e5b18'
+down_revision = 'f6b2d8e41a93'
+branch_labels = None
+depends_on = None
+
+
+TABLAS = ('vehiculo', 'gestoria', 'entrega_papeles', 'papeles_retirar')
+LOTE = 1000
+
+# (tabla, nombre del índice, único)
+INDICES = [('vehiculo', 'ix_vehiculo_patente_norm', True)] + [
+    (nombre, f'ix_{nombre}_patente_norm', False) for nombre in TABLAS[1:]
+]
+
+
+def normalizar_patente(patente):
+    # Copia de patentes.normalizar_patente al momento de esta migración
+    return re.sub(r'[^0-9A-Z]', '', (patente or '').upper())
+
+
+def completar(nombre, solo_nulos=False):
+    """Calcular patente_norm de los registros existentes, por lotes de id
+
+    Se llama dentro de un bloque autocommit: cada lote se confirma por separado,
+    así no queda una única transacción enorme que bloquee las tablas y llene el
+    undo log, y si se interrumpe lo ya completado no se pierde. Las patentes
+    sin letras ni números quedan en NULL: el índice único admite varios NULL,
+    pero no varias claves vacías.
+    """
+    conexion = op.get_bind()
+    tabla = sa.table(nombre, sa.column('id', sa.Integer), sa.column('patente', sa.String),
+                     sa.column('patente_norm', sa.String))
+    actualizar = (tabla.update()
+                  .where(tabla.c.id == sa.bindparam('registro_id'))
+                  .values(patente_norm=sa.bindparam('clave')))
+    ultimo = 0
+    while True:
+        consulta = sa.select(tabla.c.id, tabla.c.patente).where(tabla.c.id > ultimo)
+        if solo_nulos:
+            consulta = consulta.where(tabla.c.patente_norm.is_(None))
+        filas = conexion.execute(consulta.order_by(tabla.c.id).limit(LOTE)).all()
+        if not filas:
+            break
+        conexion.execute(actualizar, [{'registro_id': fila.id, 'clave': normalizar_patente(fila.patente) or None}
+                                      for fila in filas])
+        ultimo = filas[-1].id
+
+
+def upgrade():
+    for nombre in TABLAS:
+        # Sin NOT NULL: agregarla no obliga a recrear la tabla en SQLite (ni sus triggers)
+        op.add_column(nombre, sa.Column('patente_norm', sa.String(length=20), nullable=True))
+    with op.get_context().autocommit_block():
+        for nombre in TABLAS:
+            completar(nombre)
+    # Registros que la versión anterior de la aplicación insertó durante el
+    # completado, sin conocer la columna
+    for nombre in TABLAS:
+        completar(nombre, solo_nulos=True)
+
+    # Antes del índice único: vehículos cargados con la misma patente escrita distinto
+    repetidas = op.get_bind().execute(sa.text(
+        'SELECT patente_norm FROM vehiculo WHERE patente_norm IS NOT NULL '
+        'GROUP BY patente_norm HAVING COUNT(*) > 1'
+    )).scalars().all()
+    if repetidas:
+        raise RuntimeError('vehículos con la misma patente normalizada, unificarlos antes de migrar: '
+                           + ', '.join(str(patente) for patente in repetidas))
+
+    if op.get_bind().dialect.name == 'mysql':
+        # Como en indices_secundarios: InnoDB construye los índices en línea y
+        # las tablas siguen aceptando lecturas y escrituras mientras tanto
+        for tabla, nombre, unico in INDICES:
+            op.execute(f"ALTER TABLE {tabla} ADD {'UNIQUE ' if unico else ''}INDEX {nombre} (patente_norm), "
+                       "ALGORITHM=INPLACE, LOCK=NONE")
+    else:
+        for tabla, nombre, unico in INDICES:
+            op.create_index(nombre, tabla, ['patente_norm'], unique=unico)
+
+    # Los filtros por patente ya no usan los trigramas
+    op.execute("DELETE FROM busqueda_trigrama WHERE campo = 'patente'")
+
+
+def downgrade():
+    mysql = op.get_bind().dialect.name == 'mysql'
+    for tabla, nombre, unico in reversed(INDICES):
+        if mysql:
+            op.execute(f"ALTER TABLE {tabla} DROP INDEX {nombre}, ALGORITHM=INPLACE, LOCK=NONE")
+        else:
+            op.drop_index(nombre, table_name=tabla)
+    for nombre in TABLAS:
+        op.drop_column(nombre, 'patente_norm')
+
+    # Los trigramas de la patente se regeneran con: flask reindexar-busqueda
@@ -0,0 +1,34 @@
+"""version por tabla
+
+Revision ID: 2d9a6c1f8e47
+Revises: 7b1e4f2a9c3d
+Create Date: 2025-10-06 09:41:03.118245
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d9a6c1f8e47'
+down_revision = '7b1e4f2a9c3d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    version_tabla = op.create_table('version_tabla',
+    sa.Column('tabla', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('actualizado', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('tabla')
+    )
+    # Una fila por tabla para que las escrituras sólo tengan que incrementarla
+    op.bulk_insert(version_tabla, [
+        {'tabla': tabla, 'version': 1, 'actualizado': None}
+        for tabla in ('vehiculo', 'gestoria', 'entrega_papeles', 'papeles_retirar')
+    ])
+
+
+def downgrade():
+    op.drop_table('version_tabla')
@@ -0,0 +1,55 @@
+"""indices secundarios
+
+Revision ID: 5f3c8e2b7a91
+Revises: 2d9a6c1f8e47
+Create Date: 2025-10-09 11:22:48.730561
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f3c8e2b7a91'
+down_revision = '2d9a6c1f8e47'
+branch_labels = None
+depends_on = None
+
+
+# (tabla, nombre del índice, columnas) según los filtros y ordenamientos de app.py
+INDICES = [
+    ('vehiculo', 'ix_vehiculo_cliente', ['cliente']),
+    ('vehiculo', 'ix_vehiculo_fecha_creacion_id', ['fecha_creacion', 'id']),
+    ('gestoria', 'ix_gestoria_cliente', ['cliente']),
+    ('gestoria', 'ix_gestoria_patente', ['patente']),
+    ('gestoria', 'ix_gestoria_fecha_creacion_id', ['fecha_creacion', 'id']),
+    ('entrega_papeles', 'ix_entrega_papeles_cliente', ['cliente']),
+    ('entrega_papeles', 'ix_entrega_papeles_patente', ['patente']),
+    ('entrega_papeles', 'ix_entrega_papeles_fecha_creacion_id', ['fecha_creacion', 'id']),
+    ('papeles_retirar', 'ix_papeles_retirar_cliente', ['cliente']),
+    ('papeles_retirar', 'ix_papeles_retirar_patente', ['patente']),
+    ('papeles_retirar', 'ix_papeles_retirar_fecha_creacion_id', ['fecha_creacion', 'id']),
+    ('papeles_retirar', 'ix_papeles_retirar_lugar_fecha', ['lugar_registro', 'fecha_presentacion']),
+    ('papeles_retirar', 'ix_papeles_retirar_fecha_presentacion_id', ['fecha_presentacion', 'id']),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'mysql':
+        # InnoDB construye el índice en línea: las tablas siguen aceptando
+        # lecturas y escrituras mientras se crea
+        for tabla, nombre, columnas in INDICES:
+            op.execute(f"ALTER TABLE {tabla} ADD INDEX {nombre} ({', '.join(columnas)}), "
+                       "ALGORITHM=INPLACE, LOCK=NONE")
+    else:
+        for tabla, nombre, columnas in INDICES:
+            op.create_index(nombre, tabla, columnas, unique=False)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'mysql':
+        for tabla, nombre, columnas in reversed(INDICES):
+            op.execute(f"ALTER TABLE {tabla} DROP INDEX {nombre}, ALGORITHM=INPLACE, LOCK=NONE")
+    else:
+        for tabla, nombre, columnas in reversed(INDICES):
+            op.drop_index(nombre, table_name=tabla)
@@ -0,0 +1,37 @@
+"""busqueda por trigramas
+
+Revision ID: 7b1e4f2a9c3d
+Revises: c4d8dabc4800
+Create Date: 2025-10-02 10:14:27.512384
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b1e4f2a9c3d'
+down_revision = 'c4d8dabc4800'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('busqueda_trigrama',
+    sa.Column('tabla', sa.String(length=50), nullable=False),
+    sa.Column('campo', sa.String(length=50), nullable=False),
+    sa.Column('trigrama', sa.String(length=3), nullable=False),
+    sa.Column('registro_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.PrimaryKeyConstraint('tabla', 'campo', 'trigrama', 'registro_id')
+    )
+    with op.batch_alter_table('busqueda_trigrama', schema=None) as batch_op:
+        batch_op.create_index('ix_busqueda_trigrama_registro', ['tabla', 'registro_id'], unique=False)
+
+    # Los datos existentes se indexan con: flask reindexar-busqueda
+
+
+def downgrade():
+    with op.batch_alter_table('busqueda_trigrama', schema=None) as batch_op:
+        batch_op.drop_index('ix_busqueda_trigrama_registro')
+
+    op.drop_table('busqueda_trigrama')
@@ -0,0 +1,48 @@
+"""tablas de resumen del tablero
+
+Revision ID: 8c2f4a7d1b60
+Revises: 5f3c8e2b7a91
+Create Date: 2025-10-09 11:22:47.503918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c2f4a7d1b60'
+down_revision = '5f3c8e2b7a91'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('resumen_diario',
+    sa.Column('entidad', sa.String(length=50), nullable=False),
+    sa.Column('dia', sa.Date(), nullable=False),
+    sa.Column('cantidad', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('entidad', 'dia')
+    )
+    op.create_table('resumen_retiro',
+    sa.Column('lugar_registro', sa.String(length=100), nullable=False),
+    sa.Column('fecha_presentacion', sa.Date(), nullable=False),
+    sa.Column('cantidad', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('lugar_registro', 'fecha_presentacion')
+    )
+    # Cargar los contadores con los datos existentes
+    for tabla in ('vehiculo', 'gestoria', 'entrega_papeles', 'papeles_retirar'):
+        op.execute(
+            "INSERT INTO resumen_diario (entidad, dia, cantidad) "
+            f"SELECT '{tabla}', DATE(fecha_creacion), COUNT(*) FROM {tabla} "
+            "WHERE fecha_creacion IS NOT NULL GROUP BY DATE(fecha_creacion)"
+        )
+    op.execute(
+        "INSERT INTO resumen_retiro (lugar_registro, fecha_presentacion, cantidad) "
+        "SELECT lugar_registro, fecha_presentacion, COUNT(*) FROM papeles_retirar "
+        "GROUP BY lugar_registro, fecha_presentacion"
+    )
+
+
+def downgrade():
+    op.drop_table('resumen_retiro')
+    op.drop_table('resumen_diario')
@@ -0,0 +1,32 @@
+"""diario de cambios para el feed de eventos
+
+Revision ID: e3a9b5c07d12
+Revises: 8c2f4a7d1b60
+Create Date: 2025-10-14 16:05:31.218406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a9b5c07d12'
+down_revision = '8c2f4a7d1b60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cambio',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tabla', sa.String(length=50), nullable=False),
+    sa.Column('operacion', sa.String(length=10), nullable=False),
+    sa.Column('registro_id', sa.Integer(), nullable=True),
+    sa.Column('fecha', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sqlite_autoincrement=True
+    )
+
+
+def downgrade():
+    op.drop_table('cambio')
@@ -0,0 +1,62 @@
+"""indices de texto completo
+
+Revision ID: f6b2d8e41a93
+Revises: e3a9b5c07d12
+Create Date: 2025-10-16 11:42:08.613527
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6b2d8e41a93'
+down_revision = 'e3a9b5c07d12'
+branch_labels = None
+depends_on = None
+
+
+# Campos indexados por tabla, en el orden que define el rowid en FTS5
+CAMPOS = {
+    'vehiculo': ('cliente', 'modelo', 'lugar_compra', 'color'),
+    'gestoria': ('cliente', 'papeles_recibidos', 'observaciones'),
+    'entrega_papeles': ('cliente', 'documentacion_entregada'),
+    'papeles_retirar': ('cliente', 'lugar_registro', 'comentarios'),
+}
+
+
+def contenido(fila, campos):
+    return " || ' ' || ".join(f"coalesce({fila}.{campo}, '')" for campo in campos)
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'mysql':
+        for tabla, campos in CAMPOS.items():
+            op.create_index(f'ft_{tabla}_texto', tabla, list(campos), mysql_prefix='FULLTEXT')
+        return
+
+    op.execute("CREATE VIRTUAL TABLE texto_busqueda USING fts5("
+               "tabla UNINDEXED, registro_id UNINDEXED, contenido, tokenize = 'unicode61 remove_diacritics 2')")
+    for posicion, (tabla, campos) in enumerate(CAMPOS.items()):
+        insertar = (f"INSERT INTO texto_busqueda (rowid, tabla, registro_id, contenido) VALUES "
+                    f"(new.id * 4 + {posicion}, '{tabla}', new.id, {contenido('new', campos)});")
+        eliminar = f"DELETE FROM texto_busqueda WHERE rowid = old.id * 4 + {posicion};"
+        op.execute(f"CREATE TRIGGER texto_busqueda_{tabla}_ai AFTER INSERT ON {tabla} BEGIN {insertar} END")
+        op.execute(f"CREATE TRIGGER texto_busqueda_{tabla}_ad AFTER DELETE ON {tabla} BEGIN {eliminar} END")
+        op.execute(f"CREATE TRIGGER texto_busqueda_{tabla}_au AFTER UPDATE OF {', '.join(campos)} ON {tabla} "
+                   f"BEGIN {eliminar} {insertar} END")
+        # Registros existentes
+        op.execute(f"INSERT INTO texto_busqueda (rowid, tabla, registro_id, contenido) "
+                   f"SELECT id * 4 + {posicion}, '{tabla}', id, {contenido(tabla, campos)} FROM {tabla}")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'mysql':
+        for tabla in CAMPOS:
+            op.drop_index(f'ft_{tabla}_texto', table_name=tabla)
+        return
+
+    for tabla in CAMPOS:
+        for sufijo in ('ai', 'ad', 'au'):
+            op.execute(f"DROP TRIGGER texto_busqueda_{tabla}_{sufijo}")
+    op.execute("DROP TABLE texto_busqueda")
@@ -0,0 +1,97 @@
+"""
+Paginación por cursor (keyset) para los listados de la aplicación
+"""
+
+import base64
+import json
+
+from sqlalchemy import and_, or_
+
+
+class CursorInvalido(ValueError):
+    """El cursor recibido no se puede decodificar"""
+
+
+class Pagina:
+    """Una página de resultados con los cursores para navegar"""
+
+    def __init__(self, items, cursor_siguiente=None, cursor_anterior=None):
+        self.items = items
+        self.cursor_siguiente = cursor_siguiente
+        self.cursor_anterior = cursor_anterior
+
+    @property
+    def tiene_siguiente(self):
+        return self.cursor_siguiente is not None
+
+    @property
+    def tiene_anterior(self):
+        return self.cursor_anterior is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+def codificar_cursor(valor, id):
+    """Codificar la clave de orden (valor, id) de una fila como texto opaco"""
+    datos = json.dumps([valor.isoformat() if hasattr(valor, 'isoformat') else valor, id])
+    return base64.urlsafe_b64encode(datos.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor, columna):
+    """Decodificar un cursor y convertir el valor al tipo de la columna de orden"""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valor, id = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        tipo = columna.type.python_type
+        if isinstance(valor, str) and hasattr(tipo, 'fromisoformat'):
+            valor = tipo.fromisoformat(valor)
+        return valor, int(id)
+    except (ValueError, TypeError):
+        raise CursorInvalido(f'Cursor inválido: {cursor}')
+
+
+def paginar(query, columna, columna_id, por_pagina, despues=None, antes=None):
+    """Obtener una página ordenada por (columna, id) de forma descendente.
+
+    `despues` avanza hacia registros más antiguos y `antes` retrocede hacia
+    los más recientes. En ambos casos la consulta filtra por la clave de
+    orden en lugar de usar OFFSET, por lo que el costo no depende de la
+    profundidad de la página.
+    """
+    if antes:
+        valor, id = decodificar_cursor(antes, columna)
+        query = query.filter(or_(columna > valor, and_(columna == valor, columna_id > id)))
+        query = query.order_by(columna.asc(), columna_id.asc())
+    else:
+        if despues:
+            valor, id = decodificar_cursor(despues, columna)
+            query = query.filter(or_(columna < valor, and_(columna == valor, columna_id < id)))
+        query = query.order_by(columna.desc(), columna_id.desc())
+
+    filas = query.limit(por_pagina + 1).all()
+    hay_mas = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+    if antes:
+        filas.reverse()
+
+    if not filas:
+        return Pagina([])
+
+    def clave(fila):
+        return codificar_cursor(getattr(fila, columna.key), getattr(fila, columna_id.key))
+
+    if antes:
+        siguiente = clave(filas[-1])
+        anterior = clave(filas[0]) if hay_mas else None
+    else:
+        siguiente = clave(filas[-1]) if hay_mas else None
+        anterior = clave(filas[0]) if despues else None
+
+    return Pagina(filas, cursor_siguiente=siguiente, cursor_anterior=anterior)
@@ -0,0 +1,64 @@
+"""
+Patentes: clave canónica para búsquedas exactas y validación de formato
+
+La patente se guarda como se ingresó (en mayúsculas) y además, en la columna
+indexada `patente_norm`, sólo con letras y números: `AB 123 CD`, `ab-123-cd`
+y `AB123CD` tienen la misma clave. Las búsquedas por patente comparan por
+igualdad o por prefijo sobre esa columna y así recorren su índice.
+"""
+
+import re
+
+from sqlalchemy import event
+
+# Formatos argentinos vigentes
+FORMATOS = {
+    'anterior': re.compile(r'[A-Z]{3}[0-9]{3}'),         # ABC123 (1995-2016)
+    'mercosur': re.compile(r'[A-Z]{2}[0-9]{3}[A-Z]{2}'),  # AB123CD
+}
+
+LARGO = 20  # largo de las columnas patente y patente_norm
+
+
+def normalizar_patente(patente):
+    """Patente en mayúsculas y sin espacios, guiones ni puntos"""
+    return re.sub(r'[^0-9A-Z]', '', (patente or '').upper())
+
+
+def formato(patente):
+    """Nombre del formato de la patente, o None si no corresponde a ninguno"""
+    normalizada = normalizar_patente(patente)
+    return next((nombre for nombre, patron in FORMATOS.items() if patron.fullmatch(normalizada)), None)
+
+
+def validar_patente(patente):
+    """Patente normalizada; ValueError si no tiene el formato anterior ni el Mercosur"""
+    if formato(patente) is None:
+        raise ValueError(f'patente inválida: {patente} (se espera ABC123 o AB123CD)')
+    return normalizar_patente(patente)
+
+
+def patente_norm_por_defecto(contexto):
+    """Default de patente_norm para los INSERT que no la incluyen (ORM o Core)"""
+    return normalizar_patente(contexto.get_current_parameters().get('patente'))
+
+
+def prefijo_patente(columna, patente):
+    """Condición por prefijo sobre la columna normalizada, como rango del índice.
+
+    Las claves sólo tienen [0-9A-Z] y 'Z' es el mayor de esos caracteres en
+    cualquier colación, así que el rango [prefijo, prefijo + 'ZZ…'] contiene
+    exactamente las claves que empiezan con el prefijo.
+    """
+    prefijo = normalizar_patente(patente)
+    return columna.between(prefijo, prefijo + 'Z' * (LARGO - len(prefijo)))
+
+
+def _al_asignar(objetivo, valor, anterior, iniciador):
+    objetivo.patente_norm = normalizar_patente(valor)
+
+
+def registrar(*modelos):
+    """Recalcular patente_norm cada vez que se asigna la patente con el ORM"""
+    for modelo in modelos:
+        event.listen(modelo.patente, 'set', _al_asignar)
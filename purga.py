@@ -0,0 +1,64 @@
+"""
+Reinicio completo de los datos y purga de registros antiguos
+
+`reiniciar` vacía las tablas de datos y sus tablas auxiliares con TRUNCATE
+(DELETE en SQLite), que en MySQL descarta la tabla sin registrar cada fila en
+el undo log; sólo está pensado para desarrollo. `purgar_antiguos` borra los
+registros anteriores a una fecha en lotes chicos, cada uno en su propia
+transacción y con una pausa entre lotes, para no retener bloqueos mientras
+la aplicación sigue recibiendo altas.
+"""
+
+import time
+
+from sqlalchemy import select
+
+
+class Purga:
+    """Operaciones de borrado masivo sobre las tablas de datos"""
+
+    def __init__(self, db, versiones, eliminar):
+        self.db = db
+        self.versiones = versiones
+        self.eliminar = eliminar  # función (modelo, ids) -> registros eliminados
+
+    def reiniciar(self, modelos, auxiliares):
+        """Vaciar las tablas de datos y las auxiliares; devuelve las tablas vaciadas"""
+        tablas = [modelo.__table__ for modelo in (*modelos, *auxiliares)]
+        with self.db.engine.begin() as connection:
+            for tabla in tablas:
+                if connection.dialect.name == 'mysql':
+                    connection.exec_driver_sql(f'TRUNCATE TABLE `{tabla.name}`')
+                else:
+                    connection.execute(tabla.delete())
+        # TRUNCATE confirma la transacción en MySQL: la versión se incrementa aparte
+        with self.db.engine.begin() as connection:
+            self.versiones.incrementar(connection, [modelo.__tablename__ for modelo in modelos])
+        return [tabla.name for tabla in tablas]
+
+    def contar_antiguos(self, modelo, limite):
+        """Cantidad de registros creados antes de `limite`"""
+        return self.db.session.query(modelo).filter(modelo.fecha_creacion < limite).count()
+
+    def purgar_antiguos(self, modelo, limite, lote=500, pausa=0.2, progreso=None):
+        """Eliminar por lotes los registros creados antes de `limite`"""
+        columna = modelo.__table__.c
+        total = 0
+        while True:
+            # Recorre el índice (fecha_creacion, id) sin bloquear filas
+            with self.db.engine.connect() as connection:
+                ids = connection.execute(
+                    select(columna.id)
+                    .where(columna.fecha_creacion < limite)
+                    .order_by(columna.fecha_creacion, columna.id)
+                    .limit(lote)
+                ).scalars().all()
+            if not ids:
+                break
+            total += self.eliminar(modelo, ids)
+            if progreso:
+                progreso(total)
+            if len(ids) < lote:
+                break
+            time.sleep(pausa)
+        return total
@@ -0,0 +1,170 @@
+"""
+Tablas de resumen para el tablero, mantenidas de forma incremental
+
+`resumen_diario` cuenta los registros creados por entidad y día, y
+`resumen_retiro` cuenta los papeles a retirar por lugar de registro y fecha
+de presentación. Cada flush aplica la diferencia de las altas y bajas dentro
+de la misma transacción, así que el tablero nunca recorre las tablas de datos.
+Las operaciones masivas que no pasan por el ORM llaman a `ajustar` o `vaciar`
+explícitamente, y `recalcular` reconstruye todo para reparar desvíos.
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import Date, event, func, select
+from sqlalchemy.orm import attributes
+
+from fechas import hoy
+from importacion import upsert
+
+
+def _dia(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    return valor
+
+
+class Resumen:
+    """Contadores por entidad y día, y por lugar y fecha de presentación"""
+
+    def __init__(self, db, modelo_diario, modelo_retiro, modelo_lugar_retiro):
+        self.db = db
+        self.diario = modelo_diario.__table__
+        self.retiro = modelo_retiro.__table__
+        self.modelo_lugar_retiro = modelo_lugar_retiro
+        self.modelos = {}
+        event.listen(db.session, 'after_flush', self._despues_de_flush)
+
+    def registrar(self, *modelos):
+        """Contar las altas y bajas de los modelos indicados"""
+        self.modelos.update((modelo.__tablename__, modelo) for modelo in modelos)
+
+    # Diferencias a aplicar
+
+    def _claves(self, objeto, anterior=False):
+        """Claves de resumen de un registro (con los valores previos a su modificación)"""
+        def valor(campo):
+            if anterior:
+                historia = attributes.get_history(objeto, campo)
+                if historia.deleted:
+                    return historia.deleted[0]
+            return getattr(objeto, campo)
+
+        dia = _dia(valor('fecha_creacion'))
+        diario = {(objeto.__tablename__, dia)} if dia else set()
+        retiro = set()
+        if isinstance(objeto, self.modelo_lugar_retiro):
+            retiro.add((valor('lugar_registro'), valor('fecha_presentacion')))
+        return diario, retiro
+
+    def _despues_de_flush(self, session, contexto):
+        diario, retiro = Counter(), Counter()
+        for objetos, signo in ((session.new, 1), (session.deleted, -1)):
+            for objeto in objetos:
+                if getattr(objeto, '__tablename__', None) in self.modelos:
+                    claves_diario, claves_retiro = self._claves(objeto)
+                    diario.update({clave: signo for clave in claves_diario})
+                    retiro.update({clave: signo for clave in claves_retiro})
+        for objeto in session.dirty:
+            if getattr(objeto, '__tablename__', None) in self.modelos and session.is_modified(objeto):
+                antes_diario, antes_retiro = self._claves(objeto, anterior=True)
+                ahora_diario, ahora_retiro = self._claves(objeto)
+                diario.update({clave: -1 for clave in antes_diario - ahora_diario})
+                diario.update({clave: 1 for clave in ahora_diario - antes_diario})
+                retiro.update({clave: -1 for clave in antes_retiro - ahora_retiro})
+                retiro.update({clave: 1 for clave in ahora_retiro - antes_retiro})
+        if diario or retiro:
+            self.ajustar(session.connection(), diario, retiro)
+
+    def ajustar(self, connection, diario=None, retiro=None):
+        """Sumar las diferencias {(entidad, dia): n} y {(lugar, fecha): n} a los contadores"""
+        for tabla, columnas, diferencias in (
+            (self.diario, ('entidad', 'dia'), diario or {}),
+            (self.retiro, ('lugar_registro', 'fecha_presentacion'), retiro or {}),
+        ):
+            filas = [
+                {**dict(zip(columnas, clave)), 'cantidad': cantidad}
+                for clave, cantidad in sorted(diferencias.items(), key=lambda item: str(item[0]))
+                if cantidad
+            ]
+            # Un solo INSERT ... ON CONFLICT: dos transacciones que crean el mismo contador no chocan
+            if filas:
+                upsert(connection, tabla, filas, clave=columnas, sumar=('cantidad',))
+
+    def vaciar(self, connection, modelo):
+        """Poner en cero los contadores de una tabla vaciada fuera del ORM"""
+        connection.execute(self.diario.delete().where(self.diario.c.entidad == modelo.__tablename__))
+        if modelo is self.modelo_lugar_retiro:
+            connection.execute(self.retiro.delete())
+
+    # Reconstrucción
+
+    def recalcular(self):
+        """Reconstruir los contadores desde las tablas de datos"""
+        totales = {}
+        with self.db.engine.begin() as connection:
+            connection.execute(self.diario.delete())
+            connection.execute(self.retiro.delete())
+            for nombre, modelo in self.modelos.items():
+                tabla = modelo.__table__
+                dia = func.date(tabla.c.fecha_creacion, type_=Date)
+                filas = connection.execute(
+                    select(dia, func.count())
+                    .where(tabla.c.fecha_creacion.isnot(None))
+                    .group_by(dia)
+                ).all()
+                if filas:
+                    connection.execute(self.diario.insert(), [
+                        {'entidad': nombre, 'dia': fila[0], 'cantidad': fila[1]} for fila in filas
+                    ])
+                totales[nombre] = sum(fila[1] for fila in filas)
+            tabla = self.modelo_lugar_retiro.__table__
+            filas = connection.execute(
+                select(tabla.c.lugar_registro, tabla.c.fecha_presentacion, func.count())
+                .group_by(tabla.c.lugar_registro, tabla.c.fecha_presentacion)
+            ).all()
+            if filas:
+                connection.execute(self.retiro.insert(), [
+                    {'lugar_registro': fila[0], 'fecha_presentacion': fila[1], 'cantidad': fila[2]}
+                    for fila in filas
+                ])
+        return totales
+
+    # Consultas del tablero
+
+    def totales(self):
+        """Cantidad de registros por entidad"""
+        filas = self.db.session.execute(
+            select(self.diario.c.entidad, func.sum(self.diario.c.cantidad))
+            .group_by(self.diario.c.entidad)
+        ).all()
+        totales = dict.fromkeys(self.modelos, 0)
+        totales.update((entidad, int(cantidad or 0)) for entidad, cantidad in filas)
+        return totales
+
+    def por_dia(self, dias=30):
+        """Registros creados por día y entidad en los últimos `dias` días"""
+        desde = hoy() - timedelta(days=dias - 1)
+        filas = self.db.session.execute(
+            select(self.diario.c.dia, self.diario.c.entidad, self.diario.c.cantidad)
+            .where(self.diario.c.dia >= desde, self.diario.c.cantidad != 0)
+            .order_by(self.diario.c.dia.desc())
+        ).all()
+        resultado = {}
+        for dia, entidad, cantidad in filas:
+            resultado.setdefault(dia, dict.fromkeys(self.modelos, 0))[entidad] = cantidad
+        return resultado
+
+    def vencidos_por_lugar(self, dias_vencimiento):
+        """Papeles a retirar presentados hace más de `dias_vencimiento` días, por lugar"""
+        limite = hoy() - timedelta(days=dias_vencimiento)
+        total = func.sum(self.retiro.c.cantidad)
+        filas = self.db.session.execute(
+            select(self.retiro.c.lugar_registro, total)
+            .where(self.retiro.c.fecha_presentacion < limite)
+            .group_by(self.retiro.c.lugar_registro)
+            .having(total > 0)
+            .order_by(total.desc())
+        ).all()
+        return [(lugar, int(cantidad)) for lugar, cantidad in filas]
@@ -1,34 +1,52 @@
 #!/usr/bin/env python3
 """
 Script de inicio para la aplicación Documentación Vehicular
+
+    python run.py                 # servidor de desarrollo (recarga automática)
+    python run.py --produccion    # servidor waitress multihilo con ProductionConfig
 """
 
+import argparse
 import os
-from app import app, db, check_db_connection
+from app import create_app, check_db_connection
 
-def create_app():
+def iniciar_app(config_name):
     """Crear y configurar la aplicación Flask"""
-    # Configurar variables de entorno
-    os.environ.setdefault('FLASK_ENV', 'development')
-    
+    app = create_app(config_name)
+
     # Verificar conexión a la base de datos
-    if not check_db_connection():
+    if not check_db_connection(app):
         print("\n❌ No se pudo conectar a la base de datos")
         print("💡 Ejecuta los siguientes comandos para configurar las migraciones:")
         print("   1. flask db init")
         print("   2. flask db migrate")
         print("   3. flask db upgrade")
         return None
-    
-    print("✅ Conexión a MySQL exitosa")
-    print("🗄️  Base de datos: gestoria")
-    print("👤 Usuario: root (sin contraseña)")
-    
+
     return app
 
+def servir_produccion(app):
+    """Servir la aplicación con waitress usando un pool de hilos"""
+    from waitress import serve
+
+    hilos = app.config['SERVIDOR_HILOS']
+    print(f"🧵 Servidor de producción con {hilos} hilos")
+    serve(app,
+          host=app.config['SERVIDOR_HOST'],
+          port=app.config['SERVIDOR_PUERTO'],
+          threads=hilos)
+
 if __name__ == '__main__':
-    app = create_app()
-    
+    parser = argparse.ArgumentParser(description='Iniciar Documentación Vehicular')
+    parser.add_argument('--produccion', action='store_true',
+                        help='usar ProductionConfig y el servidor waitress multihilo')
+    parser.add_argument('--config', default=None,
+                        help='nombre de la configuración (development, production, testing)')
+    args = parser.parse_args()
+
+    config_name = args.config or ('production' if args.produccion else os.environ.get('FLASK_CONFIG', 'development'))
+    app = iniciar_app(config_name)
+
     if app is None:
         print("\n❌ No se pudo inicializar la aplicación")
         print("\n🔧 Pasos para configurar la base de datos:")
@@ -38,19 +56,22 @@ if __name__ == '__main__':
         print("4. Ejecuta: flask db migrate")
         print("5. Ejecuta: flask db upgrade")
         exit(1)
-    
+
     print("\n🚗 Iniciando Documentación Vehicular...")
-    print("📱 Abre tu navegador en: http://localhost:5000")
+    print(f"📱 Abre tu navegador en: http://localhost:{app.config['SERVIDOR_PUERTO']}")
     print("⏹️  Presiona Ctrl+C para detener la aplicación")
     print("=" * 50)
-    
+
     try:
-        app.run(
-            host='0.0.0.0',
-            port=5000,
-            debug=True,
-            use_reloader=True
-        )
+        if args.produccion:
+            servir_produccion(app)
+        else:
+            app.run(
+                host='0.0.0.0',
+                port=app.config['SERVIDOR_PUERTO'],
+                debug=app.config['DEBUG'],
+                use_reloader=app.config['DEBUG']
+            )
     except KeyboardInterrupt:
         print("\n👋 Aplicación detenida por el usuario")
     except Exception as e:
@@ -0,0 +1,174 @@
+"""
+Búsqueda de texto completo sobre las columnas de texto libre
+
+En MySQL cada tabla registrada tiene un índice FULLTEXT sobre sus campos de
+texto (la colación *_ai_ci ya ignora acentos y mayúsculas) y se consulta con
+MATCH ... AGAINST en modo booleano. En SQLite (pruebas y desarrollo) los
+mismos campos se copian a la tabla virtual FTS5 `texto_busqueda`, cuyo
+tokenizador quita los diacríticos; la mantienen triggers sobre cada tabla,
+así que las operaciones masivas que no pasan por el ORM también quedan
+indexadas sin hacer nada más.
+
+Los términos buscados se normalizan igual que el índice (sin acentos, en
+minúsculas), se buscan como prefijo y deben aparecer todos.
+"""
+
+import re
+
+from markupsafe import Markup
+from sqlalchemy import event, func, literal, literal_column, select, text, union_all
+from sqlalchemy.dialects.mysql import match
+
+from busqueda import normalizar
+
+TABLA_FTS = 'texto_busqueda'
+MINIMO_MYSQL = 3  # innodb_ft_min_token_size: los términos más cortos no están indexados
+
+PALABRA = re.compile(r'\w+')
+
+
+def terminos(consulta):
+    """Términos normalizados de una consulta"""
+    return PALABRA.findall(normalizar(consulta))
+
+
+def fragmento(texto, buscados, palabras=16):
+    """Extracto de `texto` alrededor de la primera coincidencia, con los términos resaltados"""
+    texto = texto or ''
+    tokens = list(PALABRA.finditer(texto))
+    if not tokens:
+        return Markup('')
+    coincide = [any(normalizar(token.group()).startswith(termino) for termino in buscados) for token in tokens]
+    primero = coincide.index(True) if True in coincide else 0
+    inicio = max(0, min(primero - palabras // 4, len(tokens) - palabras))
+    fin = min(len(tokens), inicio + palabras)
+    partes = ['…'] if inicio > 0 else []
+    posicion = tokens[inicio].start()
+    for token, resaltar in zip(tokens[inicio:fin], coincide[inicio:fin]):
+        partes.append(texto[posicion:token.start()])
+        partes.append(Markup('<mark>{}</mark>').format(token.group()) if resaltar else token.group())
+        posicion = token.end()
+    partes.append('…' if fin < len(tokens) else texto[posicion:])
+    # join escapa las partes que no son Markup
+    return Markup('').join(partes)
+
+
+class TextoCompleto:
+    """Índices de texto completo y búsqueda ordenada por relevancia"""
+
+    def __init__(self, db):
+        self.db = db
+        self.campos = {}  # modelo: campos indexados (el orden define el rowid en FTS5)
+        event.listen(db.metadata, 'after_create', self._crear_sqlite)
+        event.listen(db.metadata, 'before_drop', self._eliminar_sqlite)
+
+    def registrar(self, modelo, campos):
+        """Indexar los campos de texto de un modelo"""
+        self.campos[modelo] = tuple(campos)
+        # El índice queda asociado a la tabla por sus columnas; sólo se crea en MySQL
+        self.db.Index(f'ft_{modelo.__tablename__}_texto', *(modelo.__table__.c[campo] for campo in campos),
+                      mysql_prefix='FULLTEXT').ddl_if(dialect='mysql')
+
+    def incluir_objeto(self, objeto, nombre, tipo, reflejado, comparado):
+        """Filtro de autogenerate: la tabla FTS5 y los índices FULLTEXT se crean a mano en su migración"""
+        if tipo == 'table':
+            return not (nombre or '').startswith(TABLA_FTS)
+        if tipo == 'index':
+            return not (nombre or '').startswith('ft_')
+        return True
+
+    # SQLite: tabla FTS5 mantenida por triggers
+
+    def _rowid(self, modelo, fila):
+        # Un rowid por registro de cualquier tabla: id * cantidad de tablas + posición de la tabla
+        return f'{fila}.id * {len(self.campos)} + {list(self.campos).index(modelo)}'
+
+    def _contenido(self, modelo, fila):
+        return " || ' ' || ".join(f"coalesce({fila}.{campo}, '')" for campo in self.campos[modelo])
+
+    def sentencias_sqlite(self):
+        """DDL de la tabla FTS5 y de los triggers que la mantienen"""
+        sentencias = [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5("
+            f"tabla UNINDEXED, registro_id UNINDEXED, contenido, tokenize = 'unicode61 remove_diacritics 2')"
+        ]
+        for modelo, campos in self.campos.items():
+            tabla = modelo.__tablename__
+            insertar = (f"INSERT INTO {TABLA_FTS} (rowid, tabla, registro_id, contenido) VALUES "
+                        f"({self._rowid(modelo, 'new')}, '{tabla}', new.id, {self._contenido(modelo, 'new')});")
+            eliminar = f"DELETE FROM {TABLA_FTS} WHERE rowid = {self._rowid(modelo, 'old')};"
+            sentencias += [
+                f"CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_{tabla}_ai AFTER INSERT ON {tabla} BEGIN {insertar} END",
+                f"CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_{tabla}_ad AFTER DELETE ON {tabla} BEGIN {eliminar} END",
+                f"CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_{tabla}_au AFTER UPDATE OF {', '.join(campos)} ON {tabla} "
+                f"BEGIN {eliminar} {insertar} END",
+            ]
+        return sentencias
+
+    def _crear_sqlite(self, metadata, connection, **kw):
+        if connection.dialect.name == 'sqlite':
+            for sentencia in self.sentencias_sqlite():
+                connection.exec_driver_sql(sentencia)
+
+    def _eliminar_sqlite(self, metadata, connection, **kw):
+        if connection.dialect.name == 'sqlite':
+            connection.exec_driver_sql(f'DROP TABLE IF EXISTS {TABLA_FTS}')
+
+    def reconstruir(self):
+        """Volver a copiar los datos a la tabla FTS5 (en MySQL el índice lo mantiene el motor)"""
+        totales = {}
+        with self.db.engine.begin() as connection:
+            if connection.dialect.name != 'sqlite':
+                return totales
+            connection.exec_driver_sql(f'DELETE FROM {TABLA_FTS}')
+            for modelo in self.campos:
+                tabla = modelo.__tablename__
+                totales[tabla] = connection.exec_driver_sql(
+                    f"INSERT INTO {TABLA_FTS} (rowid, tabla, registro_id, contenido) "
+                    f"SELECT {self._rowid(modelo, tabla)}, '{tabla}', id, {self._contenido(modelo, tabla)} FROM {tabla}"
+                ).rowcount
+        return totales
+
+    # Búsqueda
+
+    def buscar(self, consulta, limite, desplazamiento=0, tablas=None):
+        """Filas (tabla, registro_id, contenido) ordenadas por relevancia y los términos buscados"""
+        buscados = terminos(consulta)
+        mysql = self.db.engine.dialect.name == 'mysql'
+        if mysql:
+            buscados = [termino for termino in buscados if len(termino) >= MINIMO_MYSQL]
+        nombres = [modelo.__tablename__ for modelo in self.campos
+                   if not tablas or modelo.__tablename__ in tablas]
+        if not buscados or not nombres:
+            return [], buscados
+        buscar = self._buscar_mysql if mysql else self._buscar_sqlite
+        return buscar(buscados, nombres, limite, desplazamiento), buscados
+
+    def _buscar_sqlite(self, buscados, nombres, limite, desplazamiento):
+        # Cada término entre comillas para que no se interprete como operador de FTS5
+        expresion = ' '.join(f'"{termino}"*' for termino in buscados)
+        filtro = '' if len(nombres) == len(self.campos) else f"AND tabla IN ({', '.join(repr(n) for n in nombres)})"
+        return self.db.session.execute(text(
+            f"SELECT tabla, registro_id, contenido FROM {TABLA_FTS} "
+            f"WHERE {TABLA_FTS} MATCH :expresion {filtro} "
+            f"ORDER BY bm25({TABLA_FTS}), rowid LIMIT :limite OFFSET :desplazamiento"
+        ), {'expresion': expresion, 'limite': limite, 'desplazamiento': desplazamiento}).all()
+
+    def _buscar_mysql(self, buscados, nombres, limite, desplazamiento):
+        expresion = ' '.join(f'+{termino}*' for termino in buscados)
+        consultas = []
+        for modelo, campos in self.campos.items():
+            if modelo.__tablename__ not in nombres:
+                continue
+            columnas = [getattr(modelo, campo) for campo in campos]
+            # Las columnas de MATCH deben ser exactamente las del índice FULLTEXT
+            puntaje = match(*columnas, against=expresion).in_boolean_mode()
+            consultas.append(
+                select(literal(modelo.__tablename__).label('tabla'), modelo.id.label('registro_id'),
+                       func.concat_ws(' ', *columnas).label('contenido'), puntaje.label('puntaje'))
+                .where(puntaje)
+            )
+        consulta = union_all(*consultas).order_by(
+            literal_column('puntaje').desc(), literal_column('tabla'), literal_column('registro_id')
+        ).limit(limite).offset(desplazamiento)
+        return self.db.session.execute(consulta).all()
@@ -0,0 +1,62 @@
+"""
+Contador de versión por tabla para validar cachés y respuestas condicionales
+
+Cada flush que inserta, modifica o elimina registros de una tabla registrada
+incrementa su versión dentro de la misma transacción, así que la versión
+confirmada siempre corresponde a los datos confirmados. Las operaciones
+masivas que no pasan por el ORM llaman a `incrementar` explícitamente.
+"""
+
+from datetime import datetime
+from itertools import chain
+
+from sqlalchemy import event, select
+
+from importacion import upsert
+
+
+class Versiones:
+    """Lee e incrementa las versiones guardadas en la tabla version_tabla"""
+
+    def __init__(self, db, modelo_version):
+        self.db = db
+        self.tabla = modelo_version.__table__
+        self.tablas = set()
+        event.listen(db.session, 'after_flush', self._despues_de_flush)
+
+    def registrar(self, *modelos):
+        """Versionar las tablas de los modelos indicados"""
+        self.tablas.update(modelo.__tablename__ for modelo in modelos)
+
+    def _despues_de_flush(self, session, contexto):
+        tablas = {
+            objeto.__tablename__
+            for objeto in chain(session.new, session.deleted, session.dirty)
+            if getattr(objeto, '__tablename__', None) in self.tablas
+            and (objeto not in session.dirty or session.is_modified(objeto))
+        }
+        if tablas:
+            nuevas = self.incrementar(session.connection(), tablas)
+            session.info.setdefault('versiones', {}).update(nuevas)
+
+    def incrementar(self, connection, tablas):
+        """Incrementar la versión de las tablas y devolver los nuevos valores"""
+        ahora = datetime.utcnow().replace(microsecond=0)
+        tablas = sorted(tablas)
+        # Crea la fila con versión 1 o suma 1 a la existente en una sola sentencia, sin carreras
+        upsert(connection, self.tabla, [{'tabla': tabla, 'version': 1, 'actualizado': ahora} for tabla in tablas],
+               clave='tabla', actualizar=('actualizado',), sumar=('version',))
+        return dict(connection.execute(
+            select(self.tabla.c.tabla, self.tabla.c.version).where(self.tabla.c.tabla.in_(tablas))
+        ).all())
+
+    def obtener(self, tabla):
+        """Versión actual y fecha de la última modificación (UTC) de una tabla"""
+        fila = self.db.session.execute(
+            select(self.tabla.c.version, self.tabla.c.actualizado).where(self.tabla.c.tabla == tabla)
+        ).first()
+        return (fila.version, fila.actualizado) if fila else (0, None)
+
+    def de_la_sesion(self, tabla):
+        """Versión que dejó la última escritura de la sesión actual sobre la tabla"""
+        return self.db.session.info.get('versiones', {}).get(tabla)
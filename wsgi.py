@@ -0,0 +1,11 @@
+"""
+Punto de entrada WSGI para servidores de producción
+
+    waitress-serve --threads=16 --port=5000 wsgi:app
+    gunicorn --workers 4 --threads 8 --bind 0.0.0.0:5000 wsgi:app
+"""
+
+import os
+from app import create_app
+
+app = create_app(os.environ.get('FLASK_CONFIG', 'production'))